@@ -16,7 +16,24 @@ app.conf.update(
     broker_transport_options={
         'max_retries': 5,
         'max_connections': 30,
-    }
+    },
+    beat_schedule={
+        # spotify / chartmetric ids of new tracks, seconds between drains
+        'drain-track-enrichment': {
+            'task': 'catalog.tasks.drain_track_enrichment',
+            'schedule': config('TRACK_ENRICHMENT_INTERVAL', default=60, cast=int),
+        },
+        # spotify playlists with a new snapshot, seconds between syncs
+        'sync-spotify-playlists': {
+            'task': 'spotify.tasks.sync_spotify_playlists',
+            'schedule': config('SPOTIFY_PLAYLIST_SYNC_INTERVAL', default=60 * 60, cast=int),
+        },
+        # similar tracks index, re-encodes the tracks updated since the last run
+        'refresh-similarity-index': {
+            'task': 'catalog.tasks.refresh_similarity_index',
+            'schedule': config('CATALOG_SIMILARITY_REFRESH_INTERVAL', default=60, cast=int),
+        },
+    },
 )
 
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
@@ -4,6 +4,7 @@ Django settings for acrylic project.
 import os
 from datetime import timedelta
 from decouple import config
+from boto3.s3.transfer import TransferConfig
 import django_heroku
 import sentry_sdk
 from sentry_sdk.integrations.django import DjangoIntegration
@@ -241,24 +242,53 @@ AWS_S3_ENDPOINT_URL = f'https://s3.{AWS_S3_REGION_NAME}.amazonaws.com'
 AWS_S3_FILE_OVERWRITE = False
 AWS_QUERYSTRING_AUTH = True
 AWS_QUERYSTRING_EXPIRE = 3600 * 24 # 1 day
+# multipart uploads in 16MB parts for large files, e.g. WAVs
+AWS_S3_TRANSFER_CONFIG = TransferConfig(multipart_threshold=16 * 1024 * 1024, multipart_chunksize=16 * 1024 * 1024, max_concurrency=4)
 
 # django-tagging
 FORCE_LOWERCASE_TAGS = True
+
+# catalog facets cache in seconds, 0 to disable
+CATALOG_FACETS_CACHE_TIMEOUT = config('CATALOG_FACETS_CACHE_TIMEOUT', default=60, cast=int)
+
+# seconds between refreshes of the similar tracks index by the workers, and between checks for a
+# new version by the web processes. Shared through the cache, so it needs Redis (REDISCLOUD_URL)
+CATALOG_SIMILARITY_REFRESH_INTERVAL = config('CATALOG_SIMILARITY_REFRESH_INTERVAL', default=60, cast=int)
+
+# new tracks waiting for spotify / chartmetric ids are drained periodically (TRACK_ENRICHMENT_INTERVAL
+# in acrylic.celery) or once a batch is pending. The drain lock and the pending counter live in the
+# cache, so they need the shared Redis cache (REDISCLOUD_URL): with LocMemCache each process has its own
+TRACK_ENRICHMENT_BATCH_SIZE = config('TRACK_ENRICHMENT_BATCH_SIZE', default=100, cast=int)
+# a track failing this many drains stops being retried
+TRACK_ENRICHMENT_MAX_ATTEMPTS = config('TRACK_ENRICHMENT_MAX_ATTEMPTS', default=5, cast=int)
+
+# public reference endpoints (genres, prices, articles...) response cache in seconds, 0 to disable
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=600, cast=int)
+
 """
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
+"""
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-        'LOCATION': os.environ.get('REDISCLOUD_URL', ''),
-        'TIMEOUT': 600, # 10 min
-        'KEY_PREFIX': 'cache',
-        'OPTIONS': {
-            'db': '0', # Redis DB nr. 0
+# shared redis cache when available, in-memory (per process) otherwise
+if os.environ.get('REDISCLOUD_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDISCLOUD_URL'),
+            'TIMEOUT': 600, # 10 min
+            'KEY_PREFIX': 'cache',
+            'OPTIONS': {
+                'db': '0', # Redis DB nr. 0
+            }
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'TIMEOUT': 600,
         }
     }
-}
-"""
 
 REST_FRAMEWORK = {
     # YOUR SETTINGS
@@ -25,6 +25,7 @@ router.register('countries', common_views.CountryViewSet, basename='country')
 router.register('artists', artist_views.ArtistViewSet)
 router.register('tracks', catalog_views.TrackViewSet)
 router.register('genres', catalog_views.GenreViewSet)
+router.register('tags', catalog_views.TagViewSet)
 router.register('distributors', catalog_views.DistributorViewSet)
 router.register('synclists', catalog_views.SyncListViewSet)
 router.register('prices', catalog_views.PriceViewSet)
@@ -46,7 +47,7 @@ router.register('my-artist/prices', catalog_views.MyPriceViewSet)
 
 
 # buyer account
-# tbd
+router.register('quotes', catalog_views.QuoteViewSet, basename='quote')
 
 
 registration_urls = (
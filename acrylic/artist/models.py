@@ -1,4 +1,5 @@
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.db.models import Q
 from django.utils.text import slugify
@@ -84,6 +85,9 @@ class Artist(BaseModel):
             models.Index(fields=['chartmetric_id']),
             models.Index(fields=['-spotify_followers']),
             models.Index(fields=['-instagram_followers']),
+            # trigram indexes for fuzzy search
+            GinIndex(fields=['name'], name='artist_artist_name_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['slug'], name='artist_artist_slug_trgm_idx', opclasses=['gin_trgm_ops']),
         ]
         constraints = [
             models.UniqueConstraint(
@@ -0,0 +1,44 @@
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Q
+from django.db.models.functions import Greatest
+from django.utils.text import slugify
+from rest_framework import filters
+
+
+class ArtistSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter with a fuzzy mode (?search=...&fuzzy=true) backed by pg_trgm:
+    matches misspelled or partial names through the GIN trigram indexes on
+    Artist.name and Artist.slug and ranks results by similarity.
+    """
+    fuzzy_param = 'fuzzy'
+
+    def is_fuzzy(self, request):
+        return request.query_params.get(self.fuzzy_param, '').lower() in ['1', 'true', 'yes']
+
+    def filter_queryset(self, request, queryset, view):
+        if not self.is_fuzzy(request):
+            return super().filter_queryset(request, queryset, view)
+
+        term = ' '.join(self.get_search_terms(request))
+        if not term:
+            return queryset
+        slug = slugify(term)
+
+        # "name %> term" operators are served by the gin_trgm_ops indexes
+        return queryset.filter(
+            Q(name__trigram_word_similar=term) | Q(slug__trigram_word_similar=slug)
+        ).annotate(
+            similarity=Greatest(TrigramWordSimilarity(term, 'name'), TrigramWordSimilarity(slug, 'slug'))
+        ).order_by('-similarity', '-id')
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': self.fuzzy_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Typo tolerant search by artist name, ranked by similarity',
+                'schema': {'type': 'boolean'},
+            },
+        ]
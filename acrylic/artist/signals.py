@@ -1,5 +1,6 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, m2m_changed
 from django.dispatch import receiver
+from django.utils import timezone
 from artist.models import Artist
 from artist.tasks import create_artist_in_hubspot_task
 from legal.tasks import request_contract_signature_task
@@ -19,3 +20,10 @@ def artist_created(sender, instance, created, **kwargs):
 
         # add artist to hubspot
         create_artist_in_hubspot_task.delay(instance.id)
+
+
+@receiver(m2m_changed, sender=Artist.tags.through)
+def artist_tags_changed(sender, instance, action, **kwargs):
+    """ tags are part of the artist payload: bump updated for conditional GETs """
+    if action in ['post_add', 'post_remove', 'post_clear'] and isinstance(instance, Artist):
+        Artist.objects.filter(pk=instance.pk).update(updated=timezone.now())
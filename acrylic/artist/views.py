@@ -9,7 +9,9 @@ from rest_framework.response import Response
 from drf_spectacular.utils import extend_schema, OpenApiParameter, inline_serializer
 from taggit.models import Tag
 from artist.permissions import IsArtistOwner
-from common.api.pagination import StandardPagination
+from artist.search import ArtistSearchFilter
+from common.api.pagination import StandardPagination, ListingPagination
+from common.api.viewsets import ConditionalGetMixin
 from catalog.serializers import TrackSerializer
 from artist.serializers import ArtistSerializer, ArtistUpdateSerializer
 from artist.models import Artist
@@ -40,14 +42,14 @@ class ArtistFilter(rest_filters.FilterSet):
 #        OpenApiParameter(name='ordering', description='Order by name, created, or updated', required=False, type=str),
 #    ],
 #)    
-class ArtistViewSet(viewsets.ReadOnlyModelViewSet):
+class ArtistViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = []
     authentication_classes = []
     lookup_field = 'uuid'
     queryset = Artist.active.all()
     serializer_class = ArtistSerializer
-    pagination_class = StandardPagination
-    filter_backends = [rest_filters.DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = ListingPagination
+    filter_backends = [rest_filters.DjangoFilterBackend, ArtistSearchFilter, filters.OrderingFilter]
     filterset_class = ArtistFilter
     search_fields = ['name', 'slug', 'bio', '=spotify_url', 'tags__name']
     ordering_fields = [
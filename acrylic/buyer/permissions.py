@@ -0,0 +1,6 @@
+from rest_framework import permissions
+
+
+class IsBuyer(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return hasattr(request.user, 'buyer')
@@ -1,5 +1,4 @@
 from django.contrib import admin
-from django.db.models import Count
 from django.urls import reverse
 from django.utils.html import format_html
 from import_export import resources
@@ -7,13 +6,15 @@ from import_export.admin import ImportExportModelAdmin
 from sorl.thumbnail import get_thumbnail
 from spotify.tasks import load_spotify_id, load_spotify_track_data
 from chartmetric.tasks import load_chartmetric_ids
-from catalog.models import Distributor, Genre, Price, TierPrice, Track, SyncList, SyncListTrack
+from catalog.counters import update_synclist_counts
+from catalog.models import Distributor, Genre, Price, TierPrice, Track, SyncList, SyncListTrack, TagCounter
 from buyer.models import Tier
 
 # import/export resources
 class TrackResource(resources.ModelResource):
     class Meta:
         model = Track
+        exclude = ['search_vector']
 
 
 @admin.register(Distributor)
@@ -23,9 +24,17 @@ class DistributorAdmin(admin.ModelAdmin):
     list_filter = ['whitelist_send', 'created', 'updated']
 
 
+@admin.register(TagCounter)
+class TagCounterAdmin(admin.ModelAdmin):
+    list_display = ['tag', 'track_count']
+    search_fields = ['tag__name']
+    readonly_fields = ['tag', 'track_count']
+    ordering = ['-track_count']
+
+
 @admin.register(Genre)
 class GenreAdmin(admin.ModelAdmin):
-    list_display = ['code', 'name', 'created', 'updated']
+    list_display = ['code', 'name', 'track_count', 'created', 'updated']
     search_fields = ['code', 'name']
     list_filter = ['created', 'updated']
 
@@ -89,7 +98,7 @@ class TrackAdmin(ImportExportModelAdmin):
     queryset = Track.objects.select_related('artist', 'distributor')
     list_display = ['isrc', 'cover_preview', 'name', 'artist_link', 'distributor', 'duration_display', 'released', 'snippet_preview',
                     'is_remix', 'is_instrumental', 'is_explicit', 'created', 'updated']
-    list_filter = ['released', 'distributor', 'is_remix', 'is_instrumental', 'created', 'updated']
+    list_filter = ['released', 'distributor', 'is_remix', 'is_instrumental', 'enrichment_pending', 'created', 'updated']
     search_fields = ['uuid', 'isrc', 'name', 'artist__name']
     raw_id_fields = ['artist']
     filter_horizontal = ['genres', 'additional_main_artists', 'featured_artists']
@@ -134,14 +143,12 @@ class SyncListAdmin(admin.ModelAdmin):
     raw_id_fields = ['artist']
     inlines = [SyncListTrackInline]
 
-    def get_queryset(self, request):
-        # Use 'annotate' to count the number of tracks for each SyncList
-        queryset = super().get_queryset(request)
-        queryset = queryset.annotate(_tracks_count=Count('tracks'))
-        return queryset
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # inline deletions skip the counter signals
+        update_synclist_counts([form.instance.pk])
 
     def tracks_count(self, obj):
-        # Use the annotated value for display
-        return obj._tracks_count
-    tracks_count.admin_order_field = '_tracks_count'
+        return obj.track_count
+    tracks_count.admin_order_field = 'track_count'
     tracks_count.short_description = 'Tracks'
\ No newline at end of file
@@ -0,0 +1,97 @@
+from django.contrib.contenttypes.models import ContentType
+from taggit.models import Tag, TaggedItem
+from catalog.counters import update_track_counters
+from catalog.models import Track
+from catalog.search import update_search_vectors
+from catalog.tags import get_tag_slug
+from catalog.tasks import schedule_track_enrichment
+
+
+MAX_BULK_TRACKS = 200
+BULK_BATCH_SIZE = 500
+
+
+def get_or_create_tags(names):
+    """
+    {name: Tag} of the given names, missing tags created with a single insert
+    """
+    names = set(names)
+    tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    missing = names - set(tags)
+    if missing:
+        Tag.objects.bulk_create(
+            [Tag(name=name, slug=get_tag_slug(name)) for name in missing],
+            batch_size=BULK_BATCH_SIZE,
+            ignore_conflicts=True
+        )
+        tags.update({tag.name: tag for tag in Tag.objects.filter(name__in=missing)})
+        for name in missing - set(tags):
+            # slug taken by another name, taggit picks a free one
+            tags[name], _ = Tag.objects.get_or_create(name=name)
+    return tags
+
+
+def add_track_terms(track_genres, track_tags):
+    """
+    Links the genres {track_id: [genre_id]} and tags {track_id: [Tag]} with one
+    insert per through table. Returns the linked (genre_ids, tag_ids).
+    """
+    Track.genres.through.objects.bulk_create(
+        [
+            Track.genres.through(track_id=track_id, genre_id=genre_id)
+            for track_id, genre_ids in track_genres.items() for genre_id in set(genre_ids)
+        ],
+        batch_size=BULK_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    content_type = ContentType.objects.get_for_model(Track)
+    TaggedItem.objects.bulk_create(
+        [
+            TaggedItem(content_type=content_type, object_id=track_id, tag=tag)
+            for track_id, tags in track_tags.items() for tag in set(tags)
+        ],
+        batch_size=BULK_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    genre_ids = {genre_id for genre_ids in track_genres.values() for genre_id in genre_ids}
+    tag_ids = {tag.id for tags in track_tags.values() for tag in tags}
+    return genre_ids, tag_ids
+
+
+def create_tracks(artist, tracks_data):
+    """
+    Inserts the tracks of the artist with bulk_create. Each item holds the Track
+    fields plus 'genres' (genre ids) and 'tags' (names), and its own artist_id when
+    artist is None.
+
+    Bulk inserts skip Track.save() and the signals, so the search vectors and counters
+    are refreshed here, and the tracks are queued for the batched external ids enrichment.
+    """
+    if not tracks_data:
+        return []
+
+    tracks, track_genres, track_tags = [], {}, {}
+    for data in tracks_data:
+        data = dict(data)
+        genre_ids = data.pop('genres', [])
+        tag_names = data.pop('tags', [])
+        if artist is not None:
+            data['artist'] = artist
+        track = Track(enrichment_pending=True, **data)
+        tracks.append((track, genre_ids, tag_names))
+
+    Track.objects.bulk_create([track for track, _, _ in tracks], batch_size=BULK_BATCH_SIZE)
+
+    tags = get_or_create_tags(name for _, _, tag_names in tracks for name in tag_names)
+    for track, genre_ids, tag_names in tracks:
+        if genre_ids:
+            track_genres[track.id] = genre_ids
+        if tag_names:
+            track_tags[track.id] = [tags[name] for name in tag_names]
+    genre_ids, tag_ids = add_track_terms(track_genres, track_tags)
+
+    track_ids = [track.id for track, _, _ in tracks]
+    update_search_vectors(Track.objects.filter(id__in=track_ids))
+    update_track_counters(genre_ids=genre_ids, tag_ids=tag_ids)
+    schedule_track_enrichment(len(track_ids))
+    return [track for track, _, _ in tracks]
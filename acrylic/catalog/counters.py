@@ -0,0 +1,76 @@
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from taggit.models import Tag, TaggedItem
+from common.cache import invalidate_model_cache
+
+
+def get_track_tagged_items():
+    return TaggedItem.objects.filter(content_type__app_label='catalog', content_type__model='track')
+
+
+def count_subquery(queryset, field):
+    """
+    Rows of queryset pointing to the outer row through field, e.g. tracks of a genre
+    """
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(count=Count('*')).values('count')
+    return Coalesce(Subquery(counts), 0)
+
+
+def update_genre_counts(genre_ids=None):
+    """
+    Recomputes Genre.track_count in a single UPDATE, all genres when genre_ids is None
+    """
+    from catalog.models import Genre, Track
+
+    genres = Genre.objects.all() if genre_ids is None else Genre.objects.filter(pk__in=genre_ids)
+    genres.update(track_count=count_subquery(Track.genres.through.objects.all(), 'genre_id'))
+    # genre responses are cached, see GenreViewSet
+    transaction.on_commit(lambda: invalidate_model_cache(Genre))
+
+
+def update_synclist_counts(synclist_ids=None):
+    """
+    Recomputes SyncList.track_count in a single UPDATE, all synclists when synclist_ids is None
+    """
+    from catalog.models import SyncList, SyncListTrack
+
+    synclists = SyncList.objects.all() if synclist_ids is None else SyncList.objects.filter(pk__in=synclist_ids)
+    synclists.update(track_count=count_subquery(SyncListTrack.objects.all(), 'synclist_id'))
+
+
+def update_tag_counts(tag_ids=None):
+    """
+    Recomputes the TagCounter of the given tags (all when None) with one
+    GROUP BY and one upsert
+    """
+    from catalog.models import TagCounter
+
+    tags = Tag.objects.all() if tag_ids is None else Tag.objects.filter(pk__in=tag_ids)
+    tagged_items = get_track_tagged_items().filter(tag__in=tags)
+    counts = dict(tagged_items.order_by().values('tag_id').annotate(count=Count('*')).values_list('tag_id', 'count'))
+    TagCounter.objects.bulk_create(
+        [TagCounter(tag_id=tag_id, track_count=counts.get(tag_id, 0)) for tag_id in tags.values_list('id', flat=True)],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['tag'],
+        update_fields=['track_count'],
+    )
+
+
+def update_track_counters(genre_ids=(), tag_ids=(), synclist_ids=()):
+    """
+    Counters of the genres, tags and synclists linked to tracks that changed in bulk
+    """
+    if genre_ids:
+        update_genre_counts(genre_ids)
+    if tag_ids:
+        update_tag_counts(tag_ids)
+    if synclist_ids:
+        update_synclist_counts(synclist_ids)
+
+
+def rebuild_counters():
+    update_genre_counts()
+    update_tag_counts()
+    update_synclist_counts()
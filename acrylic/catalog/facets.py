@@ -0,0 +1,117 @@
+import hashlib
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from taggit.models import TaggedItem
+
+from catalog.models import Track
+from catalog.tags import TAG_NAMESPACES, split_tag_name
+
+
+FLAG_FIELDS = ['is_cover', 'is_remix', 'is_instrumental', 'is_explicit']
+
+# (key, min bpm included, max bpm excluded)
+BPM_BUCKETS = [
+    ('<80', None, 80),
+    ('80-99', 80, 100),
+    ('100-119', 100, 120),
+    ('120-139', 120, 140),
+    ('140+', 140, None),
+]
+
+# query params that do not change the set of matching tracks
+IGNORED_PARAMS = ['page', 'page_size', 'ordering', 'cursor', 'format']
+
+
+def get_bpm_filter(min_bpm, max_bpm):
+    conditions = Q(bpm__isnull=False)
+    if min_bpm is not None:
+        conditions &= Q(bpm__gte=min_bpm)
+    if max_bpm is not None:
+        conditions &= Q(bpm__lt=max_bpm)
+    return conditions
+
+
+def get_track_facets(queryset):
+    """
+    Facet counts for the tracks matching the given queryset in three grouped queries:
+    genres, tags (grouped by namespace) and a single aggregate for flags, languages and BPM buckets.
+    """
+    track_ids = queryset.order_by().values('pk')
+    tracks = Track.objects.filter(pk__in=track_ids)
+
+    genres = Track.genres.through.objects.filter(
+        track_id__in=track_ids
+    ).values('genre__code', 'genre__name').annotate(count=Count('track_id')).order_by('-count', 'genre__name')
+
+    tags = TaggedItem.objects.filter(
+        content_type__app_label='catalog',
+        content_type__model='track',
+        object_id__in=track_ids
+    ).values('tag__name', 'tag__slug').annotate(count=Count('id')).order_by('-count', 'tag__name')
+
+    aggregates = {'count': Count('pk')}
+    for field in FLAG_FIELDS:
+        aggregates[field] = Count('pk', filter=Q(**{field: True}))
+    for code, _ in Track.Language.choices:
+        aggregates[f'language_{code}'] = Count('pk', filter=Q(language=code))
+    for i, (_, min_bpm, max_bpm) in enumerate(BPM_BUCKETS):
+        aggregates[f'bpm_{i}'] = Count('pk', filter=get_bpm_filter(min_bpm, max_bpm))
+    totals = tracks.aggregate(**aggregates)
+
+    # namespaced tags (moods, instruments...) are grouped by namespace
+    plain_tags = []
+    tag_namespaces = {namespace: [] for namespace in TAG_NAMESPACES}
+    for tag in tags:
+        namespace, value = split_tag_name(tag['tag__name'])
+        if namespace is None:
+            plain_tags.append({'name': tag['tag__name'], 'slug': tag['tag__slug'], 'count': tag['count']})
+        else:
+            tag_namespaces[namespace].append({'value': value, 'slug': tag['tag__slug'], 'count': tag['count']})
+
+    return {
+        'count': totals['count'],
+        'genres': [
+            {'code': genre['genre__code'], 'name': genre['genre__name'], 'count': genre['count']}
+            for genre in genres
+        ],
+        'tags': plain_tags,
+        'tag_namespaces': tag_namespaces,
+        'flags': {field: totals[field] for field in FLAG_FIELDS},
+        'languages': [
+            {'code': code, 'name': name, 'count': totals[f'language_{code}']}
+            for code, name in Track.Language.choices
+        ],
+        'bpm': [
+            {'key': key, 'min': min_bpm, 'max': max_bpm, 'count': totals[f'bpm_{i}']}
+            for i, (key, min_bpm, max_bpm) in enumerate(BPM_BUCKETS)
+        ],
+    }
+
+
+def get_facets_cache_key(query_params):
+    """
+    Cache key from the normalized filter set: param order, value order and
+    pagination/ordering params do not produce different keys.
+    """
+    params = sorted(
+        (key, sorted(value for value in query_params.getlist(key) if value))
+        for key in query_params.keys() if key not in IGNORED_PARAMS
+    )
+    params = [(key, values) for key, values in params if values]
+    digest = hashlib.md5(urlencode(params, doseq=True).encode()).hexdigest()
+    return f'catalog:track-facets:{digest}'
+
+
+def get_cached_track_facets(queryset, query_params):
+    timeout = settings.CATALOG_FACETS_CACHE_TIMEOUT
+    if not timeout:
+        return get_track_facets(queryset)
+
+    cache_key = get_facets_cache_key(query_params)
+    facets = cache.get(cache_key)
+    if facets is None:
+        facets = get_track_facets(queryset)
+        cache.set(cache_key, facets, timeout)
+    return facets
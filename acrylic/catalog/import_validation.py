@@ -0,0 +1,134 @@
+import csv
+from datetime import datetime
+import numpy as np
+from catalog.imports import SPLIT_COLUMNS, parse_splits, read_csv_columns
+from catalog.models import Track
+from catalog.validators import isrc_pattern
+
+
+ISRC_COLUMN = 'SONG ISRC CODE'
+ARTIST_COLUMN = 'ARTIST NAME'
+LENGTH_COLUMN = 'SONG LENGTH'
+BPM_COLUMN = 'BPM'
+DATE_COLUMN = 'Submitted on'
+
+REPORT_FIELDS = ['row', 'isrc', 'column', 'value', 'error']
+
+
+def map_unique(values, func):
+    """
+    func applied once per distinct value and broadcast back to every row:
+    submission columns repeat a lot (dates, splits), so this is a few calls per file
+    """
+    unique, inverse = np.unique(values, return_inverse=True)
+    results = np.empty(len(unique), dtype=object)
+    for i, value in enumerate(unique):
+        results[i] = func(value)
+    return results[inverse]
+
+
+def is_valid_date(value):
+    try:
+        datetime.strptime(value, '%Y/%m/%d')
+    except ValueError:
+        return False
+    return True
+
+
+def get_split_error(value):
+    try:
+        parse_splits(value)
+    except ValueError as error:
+        return str(error)
+    return None
+
+
+class ImportValidator:
+    """
+    Dry run of load_tracks: loads the CSV columns into arrays and checks every
+    row at once, without writing to the database. Errors are (row, column, message).
+    """
+
+    def __init__(self, path, update=False):
+        self.update = update
+        self.columns = {
+            column: np.char.strip(np.array(values, dtype=str))
+            for column, values in read_csv_columns(
+                path, [ISRC_COLUMN, ARTIST_COLUMN, LENGTH_COLUMN, BPM_COLUMN, DATE_COLUMN] + list(SPLIT_COLUMNS)
+            ).items()
+        }
+        self.count = len(self.columns[ISRC_COLUMN])
+        self.errors = []
+
+    def add_errors(self, mask, column, messages):
+        """
+        messages is a single message or an array with a message per row
+        """
+        for row in np.flatnonzero(mask):
+            message = messages if isinstance(messages, str) else messages[row]
+            self.errors.append((int(row), column, message))
+
+    def check_isrcs(self):
+        isrcs = self.columns[ISRC_COLUMN]
+        empty = isrcs == ''
+        self.add_errors(empty, ISRC_COLUMN, 'Missing ISRC, the row is skipped.')
+
+        valid = map_unique(isrcs, lambda isrc: bool(isrc_pattern.match(isrc))).astype(bool)
+        self.add_errors(~empty & ~valid, ISRC_COLUMN, 'Invalid ISRC format.')
+
+        # repeated in the file: the first row is imported
+        unique, first, inverse, counts = np.unique(isrcs, return_index=True, return_inverse=True, return_counts=True)
+        first_rows = first[inverse]
+        repeated = valid & (counts[inverse] > 1) & (first_rows != np.arange(self.count))
+        self.add_errors(repeated, ISRC_COLUMN, np.char.add('ISRC repeated, first in row ', (first_rows + 1).astype(str)))
+
+        if not self.update:
+            # one IN query for the whole file
+            existing = list(Track.objects.filter(
+                isrc__in=[isrc for isrc in unique.tolist() if isrc_pattern.match(isrc)]
+            ).values_list('isrc', flat=True).distinct())
+            in_catalog = valid & ~repeated & np.isin(isrcs, existing)
+            self.add_errors(in_catalog, ISRC_COLUMN, 'ISRC already in the catalog, the row is skipped (see --update).')
+
+    def check_values(self):
+        artists = self.columns[ARTIST_COLUMN]
+        self.add_errors(artists == '', ARTIST_COLUMN, 'Missing artist name.')
+
+        # "m:ss"
+        lengths = self.columns[LENGTH_COLUMN]
+        parts = np.char.partition(lengths, ':')
+        minutes, separators, seconds = parts[:, 0], parts[:, 1], parts[:, 2]
+        valid = (separators == ':') & np.char.isdigit(minutes) & np.char.isdigit(seconds) & (np.char.str_len(seconds) == 2)
+        valid[valid] = seconds[valid].astype(int) < 60
+        self.add_errors((lengths != '') & ~valid, LENGTH_COLUMN, 'Song length must be m:ss, e.g. 3:37.')
+
+        bpms = self.columns[BPM_COLUMN]
+        valid = np.char.isdigit(bpms)
+        valid[valid] = bpms[valid].astype(int) > 0
+        self.add_errors((bpms != '') & ~valid, BPM_COLUMN, 'BPM must be a positive whole number.')
+
+        dates = self.columns[DATE_COLUMN]
+        valid = map_unique(dates, is_valid_date).astype(bool)
+        self.add_errors((dates != '') & ~valid, DATE_COLUMN, 'Date must be YYYY/MM/DD.')
+
+    def check_splits(self):
+        for column in SPLIT_COLUMNS:
+            messages = map_unique(self.columns[column], get_split_error)
+            self.add_errors(messages != None, column, messages)  # noqa: E711, elementwise
+
+    def validate(self):
+        self.check_isrcs()
+        self.check_values()
+        self.check_splits()
+        self.errors.sort(key=lambda error: error[0])
+        return self.errors
+
+    def write_report(self, path):
+        """
+        CSV with an error per line, rows numbered from 1 as in the load_tracks output
+        """
+        with open(path, 'w', encoding='utf-8', newline='') as report_file:
+            writer = csv.writer(report_file)
+            writer.writerow(REPORT_FIELDS)
+            for row, column, message in self.errors:
+                writer.writerow([row + 1, self.columns[ISRC_COLUMN][row], column, self.columns[column][row], message])
@@ -0,0 +1,391 @@
+import csv
+import json
+import os
+import re
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from artist.models import Artist
+from catalog.bulk import BULK_BATCH_SIZE, add_track_terms, create_tracks, get_or_create_tags
+from catalog.counters import update_track_counters
+from catalog.models import Genre, Track
+from catalog.search import update_search_vectors
+from catalog.tags import make_tag_name
+from catalog.validators import isrc_pattern
+from legal.models import MasterSplit, PublishingSplit, SplitSheet
+
+
+LANGUAGES = {
+    'Spanish': 'ES',
+    'English': 'EN',
+}
+
+GENRE_COLUMNS = ['GENRE 1', 'GENRE 2', 'GENRE 3']
+
+# comma separated columns imported as namespaced tags
+TAG_COLUMNS = {
+    'MOODS': 'mood',
+    'MUSIC CULTURES': 'culture',
+    'SONG STYLES': 'style',
+    'INSTRUMENTS USED FOR THIS SONG': 'instrument',
+    'CONTENT CATEGORY': 'category',
+}
+# "no answer" option of the tag columns
+EMPTY_TAG_VALUES = ['none of these']
+
+# "holder, pct%" lists, holder is an email and sometimes a name
+SPLIT_COLUMNS = {
+    'PUBLISHING SPLITS - MUST EQUAL 100': PublishingSplit,
+    'MASTER SPLITS - MUST EQUAL 100': MasterSplit,
+}
+split_pattern = re.compile(r'([^%]*?)[\s,]*(\d+(?:\.\d+)?)\s*%')
+email_pattern = re.compile(r'\S+@\S+')
+
+# Track fields loaded from the CSV, rewritten on existing tracks with --update
+TRACK_FIELDS = [
+    'name', 'duration', 'released', 'is_cover', 'is_remix', 'is_instrumental', 'is_explicit',
+    'bpm', 'language', 'lyrics',
+]
+
+
+def parse_yes_no(value):
+    return value.strip().lower() == 'yes' if value else False
+
+
+def parse_duration(value):
+    """
+    "m:ss" song length in seconds
+    """
+    try:
+        return sum(x * int(t) for x, t in zip([60, 1], value.split(':'))) if value else None
+    except ValueError:
+        return None
+
+
+def parse_bpm(value):
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y/%m/%d').date() if value else None
+
+
+def parse_tags(row):
+    """
+    Namespaced tag names of the TAG_COLUMNS of a row, e.g. "mood:Chill"
+    """
+    names = []
+    for column, namespace in TAG_COLUMNS.items():
+        for value in (row.get(column) or '').split(','):
+            value = value.strip()
+            if not value or value.lower() in EMPTY_TAG_VALUES or '\n' in value:
+                continue
+            name = make_tag_name(namespace, value)
+            # answers in the wrong column, e.g. lyrics, are not tags
+            if len(name) <= 100 and name not in names:
+                names.append(name)
+    return names
+
+
+def parse_splits(value):
+    """
+    [(name, email, percent)] of a split column, e.g. "a@b.com, 93%, c@d.com, 7%".
+    Raises ValueError when a holder has no email, text is left over or the
+    percents do not sum to 100.
+    """
+    value = value.replace('\xa0', ' ')
+    splits = []
+    end = 0
+    for match in split_pattern.finditer(value):
+        holder = match.group(1).strip(' ,\n')
+        email = email_pattern.search(holder)
+        if email is None:
+            raise ValueError(f'No email for the {match.group(2)}% split of "{holder}".')
+        try:
+            validate_email(email.group())
+        except ValidationError:
+            raise ValueError(f'Invalid email "{email.group()}".')
+        name = (holder[:email.start()] + holder[email.end():]).strip(' ,')
+        splits.append((name, email.group().lower(), Decimal(match.group(2))))
+        end = match.end()
+
+    leftover = value[end:].strip(' ,\n')
+    if leftover:
+        raise ValueError(f'Split without percent: "{leftover}".')
+    if not splits:
+        raise ValueError('No splits.')
+    total = sum(percent for _, _, percent in splits)
+    if total != 100:
+        raise ValueError(f'Splits sum to {total:g}%, must equal 100%.')
+    return splits
+
+
+def parse_track_row(row):
+    """
+    Track fields of a row of the submissions CSV, with the artist and genre names
+    """
+    return {
+        'isrc': row['SONG ISRC CODE'].strip(),
+        'artist_name': row['ARTIST NAME'],
+        'artist_defaults': {'hometown': row['MAIN ARTIST HOMETOWN'], 'spotify_url': row['YOUR SPOTIFY ARTIST PROFILE URL']},
+        'genres': [row[column] for column in GENRE_COLUMNS if row[column]],
+        'tags': parse_tags(row),
+        'splits': {column: row.get(column) or '' for column in SPLIT_COLUMNS},
+        'track': {
+            'name': row['SONG NAME'].strip(),
+            'duration': parse_duration(row['SONG LENGTH']),
+            'released': parse_date(row['Submitted on']),
+            'is_cover': parse_yes_no(row['IS IT A COVER OF SOMEONE ELSE\'S SONG?']),
+            'is_remix': parse_yes_no(row['IS IT A REMIX?']),
+            'is_instrumental': parse_yes_no(row['IS IT AN INSTRUMENTAL?']),
+            'is_explicit': parse_yes_no(row['EXPLICIT LYRICS?']),
+            'bpm': parse_bpm(row['BPM']),
+            'language': LANGUAGES.get(row['LANGUAGE(S)'], ''),
+            'lyrics': row['LYRICS'].strip() if row['LYRICS'] else '',
+        },
+    }
+
+
+def get_csv_reader(csv_file):
+    reader = csv.DictReader(csv_file)
+    # some headers have trailing spaces, e.g. "MOODS "
+    reader.fieldnames = [name.strip() for name in reader.fieldnames]
+    return reader
+
+
+def read_csv_chunks(path, chunk_size, skip=0):
+    """
+    Yields lists of at most chunk_size (row number, row) of the CSV, starting after
+    the first skip rows. Row numbers count records, not lines: lyrics span lines.
+    """
+    # utf-8-sig: the exports start with a BOM
+    with open(path, 'r', encoding='utf-8-sig', newline='') as csv_file:
+        reader = get_csv_reader(csv_file)
+        chunk = []
+        for row_number, row in enumerate(reader):
+            if row_number < skip:
+                continue
+            chunk.append((row_number, row))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def read_csv_columns(path, columns):
+    """
+    {column: [values]} of the given columns of every CSV row, '' when the column is missing
+    """
+    values = {column: [] for column in columns}
+    with open(path, 'r', encoding='utf-8-sig', newline='') as csv_file:
+        for row in get_csv_reader(csv_file):
+            for column in columns:
+                values[column].append(row.get(column) or '')
+    return values
+
+
+class ImportCheckpoint:
+    """
+    Rows of a CSV already committed, stored next to the file so an interrupted
+    import can be resumed. Ignored when the file changed since.
+    """
+
+    def __init__(self, csv_path, path=None):
+        self.csv_path = csv_path
+        self.path = path or f'{csv_path}.checkpoint'
+
+    def load(self):
+        try:
+            with open(self.path) as checkpoint_file:
+                data = json.load(checkpoint_file)
+        except (OSError, ValueError):
+            return 0
+        if data.get('size') != os.path.getsize(self.csv_path):
+            return 0
+        return data.get('rows', 0)
+
+    def save(self, rows):
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as checkpoint_file:
+            json.dump({'size': os.path.getsize(self.csv_path), 'rows': rows}, checkpoint_file)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class TrackImporter:
+    """
+    Imports the CSV tracks chunk by chunk: artists, genres and tracks by ISRC are
+    looked up in maps loaded once, new tracks are inserted with bulk_create and,
+    with update=True, existing ones rewritten with bulk_update.
+    """
+
+    def __init__(self, update=False, split_sheets=True):
+        self.update = update
+        self.split_sheets = split_sheets
+        # the oldest artist wins for repeated names, as get_or_create(name=...) would
+        self.artists = dict(Artist.objects.order_by('-id').values_list('name', 'id'))
+        self.genres = dict(Genre.objects.order_by('-id').values_list('name', 'id'))
+        self.genre_codes = dict(Genre.objects.values_list('code', 'id'))
+        self.tracks = dict(Track.objects.order_by('-id').values_list('isrc', 'id'))
+        # ISRCs imported by this run: the first row wins for repeated ISRCs
+        self.seen = set()
+        self.stats = Counter()
+        # row numbers of the rows without a valid ISRC
+        self.invalid_rows = []
+        # (row number, column, message) of the split columns not imported
+        self.split_errors = []
+        self.tracks_with_split_sheet = set(
+            SplitSheet.objects.filter(track__isnull=False).values_list('track_id', flat=True)
+        ) if split_sheets else set()
+
+    def get_artist_id(self, name, defaults):
+        if name not in self.artists:
+            # one by one: new artists go through Artist.save and its signals (Spotify profile, contract, HubSpot)
+            self.artists[name] = Artist.objects.create(name=name, **defaults).id
+            self.stats['artists'] += 1
+        return self.artists[name]
+
+    def add_genres(self, names):
+        """
+        Creates the missing genres of a chunk with one insert, reusing genres with the same code
+        """
+        names = set(names)
+        new_genres = {}
+        for name in names:
+            if name in self.genres:
+                continue
+            code = slugify(name)
+            if code in self.genre_codes:
+                self.genres[name] = self.genre_codes[code]
+            elif code not in new_genres:
+                new_genres[code] = Genre(name=name, code=code)
+        Genre.objects.bulk_create(new_genres.values(), batch_size=BULK_BATCH_SIZE)
+        for genre in new_genres.values():
+            self.genre_codes[genre.code] = genre.id
+        for name in names:
+            self.genres.setdefault(name, self.genre_codes.get(slugify(name)))
+        self.stats['genres'] += len(new_genres)
+
+    def import_rows(self, rows):
+        """
+        Imports a chunk of (row number, row) in a single transaction
+        """
+        parsed = []
+        for row_number, row in rows:
+            if not row['SONG ISRC CODE'].strip():
+                self.stats['skipped'] += 1
+                continue
+            data = parse_track_row(row)
+            if not isrc_pattern.match(data['isrc']):
+                self.invalid_rows.append(row_number)
+                continue
+            data['row_number'] = row_number
+            parsed.append(data)
+
+        with transaction.atomic():
+            self.add_genres(name for data in parsed for name in data['genres'])
+
+            new_tracks, updated_tracks = [], {}
+            for data in parsed:
+                isrc = data['isrc']
+                if isrc in self.seen:
+                    self.stats['skipped'] += 1
+                    continue
+                self.seen.add(isrc)
+                if isrc in self.tracks:
+                    if self.update:
+                        updated_tracks[isrc] = (Track(id=self.tracks[isrc], **data['track']), data['tags'])
+                    else:
+                        self.stats['skipped'] += 1
+                    continue
+                new_tracks.append({
+                    'isrc': isrc,
+                    'artist_id': self.get_artist_id(data['artist_name'], data['artist_defaults']),
+                    'genres': [self.genres[name] for name in data['genres']],
+                    'tags': data['tags'],
+                    **data['track'],
+                })
+
+            for track in create_tracks(None, new_tracks):
+                self.tracks[track.isrc] = track.id
+            self.stats['created'] += len(new_tracks)
+
+            if updated_tracks:
+                self.update_tracks(updated_tracks.values())
+
+            if self.split_sheets:
+                self.create_split_sheets(parsed)
+
+    def update_tracks(self, tracks_tags):
+        """
+        Rewrites the TRACK_FIELDS of existing tracks and adds the missing tags
+        """
+        tracks = [track for track, _ in tracks_tags]
+        now = timezone.now()
+        for track in tracks:
+            track.updated = now
+        Track.objects.bulk_update(tracks, TRACK_FIELDS + ['updated'], batch_size=BULK_BATCH_SIZE)
+
+        tags = get_or_create_tags(name for _, names in tracks_tags for name in names)
+        _, tag_ids = add_track_terms({}, {track.id: [tags[name] for name in names] for track, names in tracks_tags if names})
+        update_search_vectors(Track.objects.filter(id__in=[track.id for track in tracks]))
+        update_track_counters(tag_ids=tag_ids)
+        self.stats['updated'] += len(tracks)
+
+    def create_split_sheets(self, parsed):
+        """
+        Split sheets of the chunk tracks without one, with bulk_create: SplitSheet.save()
+        would queue a Spotify lookup per sheet, the track already has its name
+        """
+        candidates = [
+            data for data in parsed
+            if self.tracks.get(data['isrc']) and self.tracks[data['isrc']] not in self.tracks_with_split_sheet
+        ]
+        # the sheet belongs to the track artist, also for tracks imported before
+        track_artists = dict(
+            Track.objects.filter(id__in=[self.tracks[data['isrc']] for data in candidates]).values_list('id', 'artist_id')
+        )
+
+        sheets, sheet_splits = [], []
+        for data in candidates:
+            track_id = self.tracks[data['isrc']]
+            if track_id in self.tracks_with_split_sheet:
+                continue
+            splits = {}
+            for column, value in data['splits'].items():
+                try:
+                    splits[column] = parse_splits(value)
+                except ValueError as error:
+                    self.split_errors.append((data['row_number'], column, str(error)))
+            if len(splits) < len(SPLIT_COLUMNS):
+                continue
+
+            sheets.append(SplitSheet(
+                artist_id=track_artists[track_id],
+                track_id=track_id,
+                isrc=data['isrc'],
+                track_name=data['track']['name'],
+            ))
+            sheet_splits.append(splits)
+            self.tracks_with_split_sheet.add(track_id)
+
+        SplitSheet.objects.bulk_create(sheets, batch_size=BULK_BATCH_SIZE)
+        for column, model in SPLIT_COLUMNS.items():
+            model.objects.bulk_create([
+                model(split_sheet=sheet, name=name, email=email, percent=percent)
+                for sheet, splits in zip(sheets, sheet_splits)
+                for name, email, percent in splits[column]
+            ], batch_size=BULK_BATCH_SIZE)
+        self.stats['split_sheets'] += len(sheets)
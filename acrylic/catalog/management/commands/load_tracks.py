@@ -1,10 +1,8 @@
+import time
 from django.core.management.base import BaseCommand
-from django.db import transaction
-import csv
-from datetime import datetime
-from artist.models import Artist
-from catalog.models import Track, Genre
-from django.core.files import File
+from catalog.imports import ImportCheckpoint, TrackImporter, read_csv_chunks
+from catalog.import_validation import ImportValidator
+from catalog.media import MediaIngester
 
 
 class Command(BaseCommand):
@@ -12,69 +10,78 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('csv_file', type=str, help='The CSV file to import')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Rows imported per transaction')
+        parser.add_argument('--resume', action='store_true', help='Continue after the rows of the last checkpoint')
+        parser.add_argument('--update', action='store_true', help='Rewrite the fields of tracks already imported')
+        parser.add_argument('--no-split-sheets', action='store_true', help='Do not create split sheets from the split columns')
+        parser.add_argument('--checkpoint', type=str, help='Checkpoint file, <csv_file>.checkpoint by default')
+        parser.add_argument('--media-dir', type=str, help='Directory with the WAV, MP3, cover and snippet files of the rows')
+        parser.add_argument('--media-workers', type=int, default=8, help='Parallel media uploads')
+        parser.add_argument('--validate-only', action='store_true', help='Check the rows without importing them')
+        parser.add_argument('--report', type=str, help='Error report of --validate-only, <csv_file>.errors.csv by default')
 
-    @transaction.atomic
     def handle(self, *args, **kwargs):
         csv_file_path = kwargs['csv_file']
-        
-        with open(csv_file_path, 'r', encoding='utf-8') as csv_file:
-            reader = csv.DictReader(csv_file)
-            
-            for row in reader:
-                if row['SONG ISRC CODE']:
-                    artist_name = row['ARTIST NAME']
-                    artist, _ = Artist.objects.get_or_create(
-                        name=artist_name,
-                        defaults={'hometown': row['MAIN ARTIST HOMETOWN'], 'spotify_url': row['YOUR SPOTIFY ARTIST PROFILE URL']}
-                    )
+        if kwargs['validate_only']:
+            return self.validate(csv_file_path, kwargs['report'] or f'{csv_file_path}.errors.csv', kwargs['update'])
 
-                    song_length = None
+        checkpoint = ImportCheckpoint(csv_file_path, kwargs['checkpoint'])
 
-                    LANGS = {
-                        'Spanish': 'ES',
-                        'English': 'EN',
-                    }
-                    language = LANGS.get(row['LANGUAGE(S)'], '')
-                    try:
-                        bpm = int(row['BPM']) if row['BPM'] else None
-                    except ValueError:
-                        bpm = None
-                    
-                    try:
-                        duration = sum(x * int(t) for x, t in zip([60, 1], row['SONG LENGTH'].split(":"))) if row['SONG LENGTH'] else None
-                    except ValueError:
-                        duration = None
+        start = checkpoint.load() if kwargs['resume'] else 0
+        if start:
+            self.stdout.write(f'Resuming after row {start}')
 
-                    track, created = Track.objects.get_or_create(
-                        isrc=row['SONG ISRC CODE'].strip(),
-                        defaults={
-                            'artist': artist,
-                            'name': row['SONG NAME'].strip(),
-                            # Assuming duration is provided in minutes:seconds format in the CSV
-                            'duration': duration,
-                            'released': datetime.strptime(row['Submitted on'], '%Y/%m/%d').date() if row['Submitted on'] else None,
-                            'is_cover': row['IS IT A COVER OF SOMEONE ELSE\'S SONG?'].strip().lower() == 'yes' if row['IS IT A COVER OF SOMEONE ELSE\'S SONG?'] else False,
-                            'is_remix': row['IS IT A REMIX?'].strip().lower() == 'yes' if row['IS IT A REMIX?'] else False,
-                            'is_instrumental': row['IS IT AN INSTRUMENTAL?'].strip().lower() == 'yes' if row['IS IT AN INSTRUMENTAL?'] else False,
-                            'is_explicit': row['EXPLICIT LYRICS?'].strip().lower() == 'yes' if row['EXPLICIT LYRICS?'] else False,
-                            #'record_type': Track.RecordType.STUDIO if row['HOW WAS IT RECORDED?'].strip().lower() == 'studio' else None,
-                            'bpm': bpm,
-                            'language': language,
-                            'lyrics': row['LYRICS'].strip() if row['LYRICS'] else '',
-                        }
-                    )
-                    
-                    if created:
-                        # Handle file uploads if needed, e.g.:
-                        #with open(row['UPLOAD WAV FILE // MUST MATCH NAME OF SONG EXACTLY'], 'rb') as f:
-                        #    track.file_wav.save(row['UPLOAD WAV FILE // MUST MATCH NAME OF SONG EXACTLY'], File(f))
-                        # Repeat for other file fields
-                        
-                        # Add genres
-                        genres = [row['GENRE 1'], row['GENRE 2'], row['GENRE 3']]
-                        for genre_name in genres:
-                            if genre_name:
-                                genre, _ = Genre.objects.get_or_create(name=genre_name)
-                                track.genres.add(genre)
+        importer = TrackImporter(update=kwargs['update'], split_sheets=not kwargs['no_split_sheets'])
+        media = MediaIngester(kwargs['media_dir'], kwargs['media_workers']) if kwargs['media_dir'] else None
+        started = time.monotonic()
+        rows = start
+        for chunk in read_csv_chunks(csv_file_path, kwargs['chunk_size'], skip=start):
+            importer.import_rows(chunk)
+            if media:
+                media.ingest(chunk, importer.tracks)
+            # the chunk is committed
+            rows = chunk[-1][0] + 1
+            checkpoint.save(rows)
 
-                    self.stdout.write(self.style.SUCCESS(f'Successfully imported "{track.name}" by {artist.name}'))
+            elapsed = time.monotonic() - started
+            stats = importer.stats
+            self.stdout.write(
+                f'Rows {chunk[0][0] + 1}-{rows}: {stats["created"]} created, {stats["updated"]} updated, '
+                f'{stats["skipped"]} skipped ({(rows - start) / elapsed:.0f} rows/s)'
+            )
+
+        checkpoint.clear()
+        if importer.invalid_rows:
+            self.stdout.write(self.style.WARNING(
+                f'{len(importer.invalid_rows)} rows without a valid ISRC: {", ".join(str(row + 1) for row in importer.invalid_rows)}'
+            ))
+        if media:
+            if media.missing:
+                more = f' and {len(media.missing) - 20} more' if len(media.missing) > 20 else ''
+                self.stdout.write(self.style.WARNING(
+                    f'{len(media.missing)} media files not found: {", ".join(media.missing[:20])}{more}'
+                ))
+            self.stdout.write(f'Media: {media.uploaded} files uploaded, {media.reused} already stored')
+        for row_number, column, message in importer.split_errors:
+            self.stdout.write(self.style.WARNING(f'Row {row_number + 1}, {column}: {message}'))
+        elapsed = time.monotonic() - started
+        stats = importer.stats
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {rows - start} rows in {elapsed:.1f}s: {stats["created"]} tracks created, '
+            f'{stats["updated"]} updated, {stats["skipped"]} skipped, {len(importer.invalid_rows)} invalid, '
+            f'{stats["artists"]} new artists, {stats["genres"]} new genres, {stats["split_sheets"]} split sheets'
+        ))
+
+    def validate(self, csv_file_path, report_path, update):
+        started = time.monotonic()
+        validator = ImportValidator(csv_file_path, update=update)
+        errors = validator.validate()
+        validator.write_report(report_path)
+        elapsed = time.monotonic() - started
+
+        rows = len({row for row, _, _ in errors})
+        message = (
+            f'Checked {validator.count} rows in {elapsed:.2f}s: {len(errors)} errors in {rows} rows, '
+            f'report written to {report_path}'
+        )
+        self.stdout.write(self.style.WARNING(message) if errors else self.style.SUCCESS(message))
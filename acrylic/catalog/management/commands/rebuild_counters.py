@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from catalog.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the genre, tag and synclist track counters'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_counters()
+        self.stdout.write(self.style.SUCCESS('Rebuilt genre, tag and synclist track counters'))
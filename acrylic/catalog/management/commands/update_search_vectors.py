@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from catalog.models import Track
+from catalog.search import update_search_vectors
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search vector of all tracks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Tracks updated per statement')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        track_ids = list(Track.objects.order_by('id').values_list('id', flat=True))
+
+        updated = 0
+        for i in range(0, len(track_ids), batch_size):
+            updated += update_search_vectors(Track.objects.filter(id__in=track_ids[i:i + batch_size]))
+        self.stdout.write(self.style.SUCCESS(f'Updated search vector of {updated} tracks'))
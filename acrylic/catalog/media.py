@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from django.core.files import File
+from django.utils import timezone
+from catalog.models import Track
+
+
+# CSV filename column -> Track file field
+MEDIA_COLUMNS = {
+    'UPLOAD WAV FILE // MUST MATCH NAME OF SONG EXACTLY': 'file_wav',
+    'UPLOAD MP3 // MUST MATCH NAME OF SONG EXACTLY': 'file_mp3',
+    'UPLOAD COVER ART // MUST MATCH NAME OF SONG EXACTLY': 'cover_image',
+    'Snippet': 'snippet',
+}
+MEDIA_FIELDS = list(MEDIA_COLUMNS.values())
+
+MANIFEST_NAME = '.media-manifest.json'
+
+
+def get_file_hash(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as media_file:
+        for block in iter(lambda: media_file.read(1024 * 1024), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def get_media_name(file_hash, path):
+    """
+    Content addressed storage name: the same file is stored once, whatever
+    track or row it comes from (FileField names are limited to 100 chars)
+    """
+    return f'tracks/media/{file_hash[:32]}{os.path.splitext(path)[1].lower()}'
+
+
+class MediaIngester:
+    """
+    Uploads the submission files of the imported rows from a local directory.
+
+    Files are matched to the rows by the CSV filename columns (case insensitive),
+    hashed and uploaded by a bounded thread pool, large WAVs as multipart uploads
+    (AWS_S3_TRANSFER_CONFIG). Files already stored with the same content hash are
+    not uploaded again, and a manifest in the directory remembers the files done
+    so a resumed import does not hash them again.
+    """
+
+    def __init__(self, media_dir, workers=8):
+        self.media_dir = media_dir
+        self.workers = workers
+        self.files = {}
+        for root, _, names in os.walk(media_dir):
+            for name in names:
+                self.files.setdefault(name.lower(), os.path.join(root, name))
+        self.manifest_path = os.path.join(media_dir, MANIFEST_NAME)
+        try:
+            with open(self.manifest_path) as manifest_file:
+                self.manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            self.manifest = {}
+        # file names of the rows without a matching file
+        self.missing = []
+        self.uploaded = 0
+        self.reused = 0
+
+    def find_file(self, filename):
+        return self.files.get(os.path.basename(filename.strip()).lower())
+
+    def get_manifest_key(self, path, storage):
+        return f'{getattr(storage, "bucket_name", "")}:{os.path.relpath(path, self.media_dir)}'
+
+    def store_file(self, path, storage):
+        """
+        Storage name of the local file, uploaded unless already stored. Runs in the pool.
+        """
+        stat = os.stat(path)
+        done = self.manifest.get(self.get_manifest_key(path, storage))
+        if done and done['size'] == stat.st_size and done['mtime'] == stat.st_mtime:
+            return done['name'], False
+
+        name = get_media_name(get_file_hash(path), path)
+        uploaded = False
+        if not storage.exists(name):
+            with open(path, 'rb') as media_file:
+                name = storage.save(name, File(media_file, name=os.path.basename(path)))
+            uploaded = True
+        return name, uploaded
+
+    def ingest(self, rows, tracks):
+        """
+        Stores the media of a chunk of (row number, row) and links them to the tracks
+        {isrc: track id} with one bulk_update. Fields already set are left alone.
+        """
+        wanted = {}
+        for _, row in rows:
+            track_id = tracks.get(row['SONG ISRC CODE'].strip())
+            if track_id is None:
+                continue
+            for column, field_name in MEDIA_COLUMNS.items():
+                filename = (row.get(column) or '').strip()
+                if not filename:
+                    continue
+                path = self.find_file(filename)
+                if path is None:
+                    self.missing.append(filename)
+                    continue
+                wanted.setdefault(track_id, {}).setdefault(field_name, path)
+        if not wanted:
+            return 0
+
+        current = {track['id']: track for track in Track.objects.filter(id__in=wanted).values('id', *MEDIA_FIELDS)}
+        # one upload per local file and storage: covers shared by tracks are stored once
+        uploads = {
+            (path, Track._meta.get_field(field_name).storage)
+            for track_id, fields in wanted.items()
+            for field_name, path in fields.items() if not current[track_id][field_name]
+        }
+        if not uploads:
+            return 0
+
+        stored = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {upload: executor.submit(self.store_file, *upload) for upload in uploads}
+            for (path, storage), future in futures.items():
+                name, uploaded = future.result()
+                stored[(path, storage)] = name
+                if uploaded:
+                    self.uploaded += 1
+                else:
+                    self.reused += 1
+                stat = os.stat(path)
+                self.manifest[self.get_manifest_key(path, storage)] = {
+                    'name': name, 'size': stat.st_size, 'mtime': stat.st_mtime
+                }
+
+        now = timezone.now()
+        updated = []
+        for track_id, fields in wanted.items():
+            track = Track(id=track_id, updated=now, **{field: current[track_id][field] for field in MEDIA_FIELDS})
+            changed = False
+            for field_name, path in fields.items():
+                if not current[track_id][field_name]:
+                    setattr(track, field_name, stored[(path, Track._meta.get_field(field_name).storage)])
+                    changed = True
+            if changed:
+                updated.append(track)
+        Track.objects.bulk_update(updated, MEDIA_FIELDS + ['updated'], batch_size=500)
+        self.save_manifest()
+        return len(updated)
+
+    def save_manifest(self):
+        tmp_path = f'{self.manifest_path}.tmp'
+        with open(tmp_path, 'w') as manifest_file:
+            json.dump(self.manifest, manifest_file)
+        os.replace(tmp_path, self.manifest_path)
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:23
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artist', '0018_artist_isni_artist_artist_arti_isni_0bacd9_idx'),
+        ('catalog', '0026_genre_catalog_genre_uuid_idx_and_more'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='track',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='catalog_track_search_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0027_track_search_vector'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagCounter',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counter', serialize=False, to='taggit.tag')),
+                ('track_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='track_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='synclist',
+            name='track_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='genre',
+            index=models.Index(fields=['track_count'], name='catalog_gen_track_c_88d123_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tagcounter',
+            index=models.Index(fields=['track_count'], name='catalog_tag_track_c_4f801a_idx'),
+        ),
+    ]
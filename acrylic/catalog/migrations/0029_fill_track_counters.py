@@ -0,0 +1,36 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def fill_track_counters(apps, schema_editor):
+    Genre = apps.get_model('catalog', 'Genre')
+    SyncList = apps.get_model('catalog', 'SyncList')
+    SyncListTrack = apps.get_model('catalog', 'SyncListTrack')
+    TagCounter = apps.get_model('catalog', 'TagCounter')
+    Track = apps.get_model('catalog', 'Track')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+
+    genre_counts = Track.genres.through.objects.values('genre_id').annotate(count=Count('*')).values_list('genre_id', 'count')
+    for genre_id, count in genre_counts:
+        Genre.objects.filter(pk=genre_id).update(track_count=count)
+
+    synclist_counts = SyncListTrack.objects.values('synclist_id').annotate(count=Count('*')).values_list('synclist_id', 'count')
+    for synclist_id, count in synclist_counts:
+        SyncList.objects.filter(pk=synclist_id).update(track_count=count)
+
+    tag_counts = TaggedItem.objects.filter(
+        content_type__app_label='catalog',
+        content_type__model='track'
+    ).values('tag_id').annotate(count=Count('*')).values_list('tag_id', 'count')
+    TagCounter.objects.bulk_create([TagCounter(tag_id=tag_id, track_count=count) for tag_id, count in tag_counts])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0028_track_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_track_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artist', '0019_artist_trigram_indexes'),
+        ('catalog', '0029_fill_track_counters'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='track',
+            name='enrichment_pending',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(condition=models.Q(('enrichment_pending', True)), fields=['id'], name='catalog_track_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0030_track_enrichment_pending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='track',
+            name='enrichment_attempts',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+    ]
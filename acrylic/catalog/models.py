@@ -1,16 +1,19 @@
 from datetime import timedelta
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
-from django.db.models import Count
+from django.db.models import Count, Max, Min, Prefetch
+from django.utils import timezone
 from django.utils.text import slugify
 from taggit.managers import TaggableManager
 from taggit.models import Tag, TaggedItem
 
 from common.models import BaseModel
 from common.storage import public_storage
-from spotify.tasks import load_spotify_id
-from chartmetric.tasks import load_chartmetric_ids
+from catalog.tasks import schedule_track_enrichment
 from catalog.validators import validate_isrc
+from catalog.pricing import USE_TYPES, get_track_price
 
 
 class Distributor(BaseModel):
@@ -31,12 +34,15 @@ class Distributor(BaseModel):
 class Genre(BaseModel):
     name = models.CharField(max_length=80)
     code = models.SlugField(max_length=80, unique=True)
+    # maintained by catalog.counters
+    track_count = models.PositiveIntegerField(default=0, editable=False)
     
     class Meta:
         ordering = ['name']
         indexes = BaseModel.Meta.indexes + [
             models.Index(fields=['name']),
             models.Index(fields=['code']),
+            models.Index(fields=['track_count']),
         ]
 
     def __str__(self):
@@ -49,10 +55,40 @@ class Genre(BaseModel):
         super(Genre, self).save(*args, **kwargs)
 
 
+class TagCounter(models.Model):
+    """
+    Number of tracks tagged with a tag, maintained by catalog.counters
+    """
+    tag = models.OneToOneField(Tag, related_name='counter', primary_key=True, on_delete=models.CASCADE)
+    track_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['track_count']),
+        ]
+
+    def __str__(self):
+        return f'{self.tag} ({self.track_count})'
+
+
 def get_upload_path(instance, filename):
     return f'tracks/{instance.uuid}/{filename}'
 
 
+class PriceQuerySet(models.QuerySet):
+    def with_price_range(self):
+        """ min/max single use and subscription prices across tiers """
+        return self.annotate(
+            min_single_use_price=Min('tier_prices__single_use_price'),
+            max_single_use_price=Max('tier_prices__single_use_price'),
+            min_subscription_price=Min('tier_prices__subscription_price'),
+            max_subscription_price=Max('tier_prices__subscription_price'),
+        )
+
+    def with_tier_prices(self):
+        return self.prefetch_related(Prefetch('tier_prices', queryset=TierPrice.objects.select_related('tier')))
+
+
 class Price(BaseModel):
     name = models.CharField(max_length=150)
     description = models.TextField(blank=True)
@@ -61,18 +97,41 @@ class Price(BaseModel):
     active = models.BooleanField(default=False)
     order = models.PositiveBigIntegerField(default=0)
 
+    objects = PriceQuerySet.as_manager()
+
     class Meta:
         ordering = ['order']
         indexes = BaseModel.Meta.indexes + [
             models.Index(fields=['order']),
         ]
 
-    def get_available_tracks(self, artist):
+    @staticmethod
+    def get_artist_track_counts(artist):
+        """ {price_id: number of tracks} for all the prices of an artist in a single GROUP BY query """
+        tracks = artist.tracks.exclude(price=None).order_by()
+        return dict(tracks.values('price').annotate(count=Count('id')).values_list('price', 'count'))
+
+    def get_available_tracks(self, artist, track_counts=None):
         if self.max_artist_tracks > 0:
-            available_tracks = self.max_artist_tracks - artist.tracks.filter(price=self).count()
+            if track_counts is None:
+                track_counts = Price.get_artist_track_counts(artist)
+            available_tracks = self.max_artist_tracks - track_counts.get(self.pk, 0)
             return available_tracks if available_tracks > 0 else 0
         return 'unlimited'
 
+    def get_price_range(self, name):
+        """
+        Min/max price, e.g. get_price_range('min_single_use_price'). Uses the
+        with_price_range() annotation if present, tier prices otherwise.
+        """
+        if hasattr(self, name):
+            return getattr(self, name)
+        bound, field = name.split('_', 1)
+        amounts = [getattr(tier_price, field) for tier_price in self.tier_prices.all()]
+        if not amounts:
+            return None
+        return min(amounts) if bound == 'min' else max(amounts)
+
     def __str__(self):
         return self.name
 
@@ -147,10 +206,8 @@ class Track(BaseModel):
     # cost
     price = models.ForeignKey(Price, related_name='tracks', blank=True, null=True, on_delete=models.SET_NULL)
 
-    #moods
-    #cultures
-    #instruments
-    #styles
+    # moods, cultures, instruments, styles and content categories are
+    # namespaced tags, e.g. "mood:Chill" (see catalog.tags)
     #season
     #similar_artists
 
@@ -161,12 +218,22 @@ class Track(BaseModel):
     # metrics
     spotify_popularity = models.PositiveIntegerField(default=0) # integer between 1 and 100
 
+    # full-text search: name, artist, tags, genres and lyrics (see catalog.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # waiting for the Spotify / Chartmetric ids, see catalog.tasks.drain_track_enrichment
+    enrichment_pending = models.BooleanField(default=False, editable=False)
+    # failed enrichments, the track stops being pending after TRACK_ENRICHMENT_MAX_ATTEMPTS
+    enrichment_attempts = models.PositiveSmallIntegerField(default=0, editable=False)
+
     class Meta:
         ordering = ['-id']
         indexes = BaseModel.Meta.indexes + [
             models.Index(fields=['isrc']),
             models.Index(fields=['spotify_id']),
             models.Index(fields=['chartmetric_id']),
+            GinIndex(fields=['search_vector'], name='catalog_track_search_idx'),
+            models.Index(fields=['id'], condition=models.Q(enrichment_pending=True), name='catalog_track_pending_idx'),
         ]
 
     def __str__(self):
@@ -175,13 +242,13 @@ class Track(BaseModel):
     def save(self, *args, **kwargs):
         # load external ids when object is created
         load_ids = True if not self.id else False
+        if load_ids:
+            # spotify / chartmetric ids are loaded in batches
+            self.enrichment_pending = True
         super(Track, self).save(*args, **kwargs)
 
         if load_ids:
-            # async load spotify ids
-            load_spotify_id.delay(self.id, load_data=True)
-            # async task to load charmetric ids
-            load_chartmetric_ids.delay(self.id)
+            schedule_track_enrichment()
 
     def get_duration(self):
         if self.duration:
@@ -196,23 +263,18 @@ class Track(BaseModel):
     def get_latest_signed_splitsheet(self):
         return self.split_sheets.exclude(signed=None).order_by('-signed').first()
 
-    def get_price(self, user, use_type):
+    def get_price(self, user, use_type, matrix=None):
+        """
+        Price for the buyer, pass the request matrix when pricing several tracks
+        (catalog.pricing.get_request_price_matrix)
+        """
         if not getattr(user, 'buyer'):
             raise Exception('User is not a buyer')
-        if use_type not in ['single_use', 'subscription']:
+        if use_type not in USE_TYPES:
             raise Exception('Unknown use_type')
-        
-        # get price for a given user
-        if self.price:
-            # custom price
-            price = self.price
-        else:
-            # default price
-            price = Price.objects.get(default=True)
-        
-        tier_price = price.tier_prices.get(tier=user.buyer.tier)
-        amount = getattr(tier_price, f'{use_type}_price')
-        return amount
+
+        # custom price or default price, from the cached price matrix
+        return get_track_price(self, user.buyer.tier_id, use_type, matrix)
 
     def get_spotify_url(self):
         if self.spotify_id:
@@ -241,20 +303,49 @@ class SyncList(BaseModel):
     order = models.PositiveIntegerField(default=0)
     pinned = models.BooleanField(default=True, help_text='Pinned in artist profile.')
     tracks = models.ManyToManyField('catalog.Track', through='catalog.SyncListTrack', related_name='synclists', blank=True)
+    # maintained by catalog.counters
+    track_count = models.PositiveIntegerField(default=0, editable=False)
+
+    def touch(self):
+        """
+        New updated timestamp (ETag / Last-Modified) after its tracks changed
+        """
+        SyncList.objects.filter(pk=self.pk).update(updated=timezone.now())
+
+    def get_prefetched_tracks(self, *lookups):
+        """
+        Tracks from a prefetched synclisttrack_set, when the given track lookups
+        are prefetched as well. Returns None otherwise.
+        """
+        prefetched = getattr(self, '_prefetched_objects_cache', {})
+        if 'synclisttrack_set' not in prefetched:
+            return None
+        tracks = [synclist_track.track for synclist_track in prefetched['synclisttrack_set']]
+        for track in tracks:
+            if not all(lookup in getattr(track, '_prefetched_objects_cache', {}) for lookup in lookups):
+                return None
+        return tracks
 
     def get_genres(self):
-        # return genres
-        track_ids = self.tracks.values_list('id', flat=True)
-        return Genre.objects.filter(tracks__in=track_ids)
+        # distinct genres of the synclist tracks
+        tracks = self.get_prefetched_tracks('genres')
+        if tracks is not None:
+            genres = {genre.pk: genre for track in tracks for genre in track.genres.all()}
+            return sorted(genres.values(), key=lambda genre: genre.name)
+        return Genre.objects.filter(tracks__synclists=self).distinct()
 
     def get_tags(self):
-        track_ids = self.tracks.values_list('id', flat=True)
-        tagged_item_ids = TaggedItem.objects.filter(
-            content_type__app_label='catalog',  # Use the correct app label
-            content_type__model='track', # Model name must be lowercase
-            object_id__in=track_ids
-        ).values_list('id', flat=True)  # Retrieve only tag IDs to avoid unnecessary data
-        return Tag.objects.filter(taggit_taggeditem_items__in=tagged_item_ids)
+        # distinct tags of the synclist tracks
+        tracks = self.get_prefetched_tracks('tags')
+        if tracks is not None:
+            tags = {tag.pk: tag for track in tracks for tag in track.tags.all()}
+            return sorted(tags.values(), key=lambda tag: tag.name)
+        track_ids = self.tracks.values('id')
+        return Tag.objects.filter(
+            taggit_taggeditem_items__content_type__app_label='catalog',  # Use the correct app label
+            taggit_taggeditem_items__content_type__model='track', # Model name must be lowercase
+            taggit_taggeditem_items__object_id__in=track_ids
+        ).distinct().order_by('name')
 
     def __str__(self):
         return self.name 
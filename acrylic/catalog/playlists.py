@@ -0,0 +1,285 @@
+from collections import Counter
+from datetime import datetime
+from dateutil import parser as date_parser
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from artist.models import Artist
+from catalog.bulk import BULK_BATCH_SIZE, create_tracks
+from catalog.models import Track
+from catalog.search import update_search_vectors
+from catalog.tasks import SPOTIFY_TRACKS_BATCH, schedule_track_enrichment
+from spotify.models import SpotifyPlaylistTrack
+from spotify.tasks import SPOTIFY_ARTISTS_BATCH, load_spotify_artists_data
+
+
+# Track fields written from the Spotify track
+TRACK_FIELDS = ['isrc', 'name', 'artist_id', 'duration', 'released', 'spotify_popularity']
+
+# what a playlist sync reads of each item, full tracks are only requested for the added ones
+PLAYLIST_ITEM_FIELDS = 'items(added_at,track(id,type,is_local)),next'
+
+
+def get_playlist_items(spotify, playlist_id, fields=None):
+    """
+    Every item of the playlist. spotipy retries rate limited pages after their
+    Retry-After, so the pages are requested back to back.
+    """
+    results = spotify.playlist_items(playlist_id, fields=fields, additional_types=['track'])
+    items = results['items']
+    while results['next']:
+        results = spotify.next(results)
+        items.extend(results['items'])
+    return items
+
+
+def get_item_track(item):
+    """
+    Spotify track of a playlist item, None for local files, episodes and unavailable tracks
+    """
+    track_info = item.get('track')
+    if not track_info or track_info.get('is_local') or not track_info.get('id') or track_info.get('type', 'track') != 'track':
+        return None
+    return track_info
+
+
+def parse_release_date(value):
+    """
+    Album release date, "2021" and "2021-05" are completed with the 1st of January / the month
+    """
+    if not value:
+        return None
+    return date_parser.parse(value, default=datetime(datetime.now().year, 1, 1)).date()
+
+
+def get_track_values(track_info, artist_id):
+    return {
+        'isrc': track_info.get('external_ids', {}).get('isrc', ''),
+        'name': track_info['name'],
+        'artist_id': artist_id,
+        'duration': int(track_info['duration_ms']),
+        'released': parse_release_date(track_info['album'].get('release_date')),
+        'spotify_popularity': int(track_info.get('popularity') or 0),
+    }
+
+
+class PlaylistImporter:
+    """
+    Upserts the tracks of Spotify playlists and their artists by spotify_id.
+
+    Artists and tracks are collected first and written with a bulk_create for the new
+    ones and a bulk_update for the ones that changed. Spotify ids are not unique in the
+    catalog (tracks and artists without one are blank), so rows are matched with one
+    IN query per model and the oldest row of an id wins.
+    """
+
+    def __init__(self):
+        self.stats = Counter()
+
+    def upsert_artists(self, artists_info):
+        """
+        {spotify_id: artist id} of the Spotify artists {spotify_id: artist info}
+        """
+        artists = {}
+        for artist in Artist.objects.filter(spotify_id__in=artists_info).order_by('-id').only('id', 'spotify_id', 'name', 'spotify_url'):
+            artists[artist.spotify_id] = artist
+
+        now = timezone.now()
+        updated = []
+        for spotify_id, artist in artists.items():
+            artist_info = artists_info[spotify_id]
+            spotify_url = artist_info['external_urls'].get('spotify')
+            if (artist.name, artist.spotify_url) != (artist_info['name'], spotify_url):
+                artist.name = artist_info['name']
+                artist.spotify_url = spotify_url
+                artist.updated = now
+                updated.append(artist)
+        Artist.objects.bulk_update(updated, ['name', 'spotify_url', 'updated'], batch_size=BULK_BATCH_SIZE)
+
+        # bulk_create skips the artist_created signal: artists from playlists have no
+        # user to send a contract or add to Hubspot, the profile images load in batches
+        created = Artist.objects.bulk_create(
+            [
+                Artist(spotify_id=spotify_id, name=artist_info['name'], spotify_url=artist_info['external_urls'].get('spotify'))
+                for spotify_id, artist_info in artists_info.items() if spotify_id not in artists
+            ],
+            batch_size=BULK_BATCH_SIZE
+        )
+        created_ids = [artist.id for artist in created]
+        if created_ids:
+            transaction.on_commit(lambda: [
+                load_spotify_artists_data.delay(created_ids[i:i + SPOTIFY_ARTISTS_BATCH])
+                for i in range(0, len(created_ids), SPOTIFY_ARTISTS_BATCH)
+            ])
+
+        self.stats['artists_created'] += len(created)
+        self.stats['artists_updated'] += len(updated)
+        artist_ids = {spotify_id: artist.id for spotify_id, artist in artists.items()}
+        artist_ids.update({artist.spotify_id: artist.id for artist in created})
+        return artist_ids
+
+    def upsert_tracks(self, tracks_values):
+        """
+        {spotify_id: track id} of the tracks {spotify_id: Track field values}. New tracks
+        and tracks without cover art or snippet are left to the batched enrichment
+        (see catalog.tasks.drain_track_enrichment), which loads them from Spotify.
+        """
+        tracks = {}
+        for track in Track.objects.filter(spotify_id__in=tracks_values).order_by('-id').only(
+            'id', 'spotify_id', 'cover_image', 'snippet', 'enrichment_pending', *TRACK_FIELDS
+        ):
+            tracks[track.spotify_id] = track
+
+        now = timezone.now()
+        updated = []
+        pending = 0
+        for spotify_id, track in tracks.items():
+            values = tracks_values[spotify_id]
+            changed = any(getattr(track, field) != value for field, value in values.items())
+            for field, value in values.items():
+                setattr(track, field, value)
+            if not track.enrichment_pending and (not track.cover_image or not track.snippet):
+                track.enrichment_pending = True
+                pending += 1
+                changed = True
+            if changed:
+                track.updated = now
+                updated.append(track)
+        Track.objects.bulk_update(updated, TRACK_FIELDS + ['enrichment_pending', 'updated'], batch_size=BULK_BATCH_SIZE)
+        if updated:
+            # names and artists are searchable
+            update_search_vectors(Track.objects.filter(id__in=[track.id for track in updated]))
+        if pending:
+            schedule_track_enrichment(pending)
+
+        created = create_tracks(None, [
+            dict(values, spotify_id=spotify_id) for spotify_id, values in tracks_values.items() if spotify_id not in tracks
+        ])
+
+        self.stats['created'] += len(created)
+        self.stats['updated'] += len(updated)
+        self.stats['unchanged'] += len(tracks) - len(updated)
+        track_ids = {spotify_id: track.id for spotify_id, track in tracks.items()}
+        track_ids.update({track.spotify_id: track.id for track in created})
+        return track_ids
+
+    def set_additional_artists(self, track_artists):
+        """
+        Replaces the additional main artists of the tracks {track id: [artist id]}
+        with one delete and one insert
+        """
+        through = Track.additional_main_artists.through
+        through.objects.filter(track_id__in=track_artists).delete()
+        through.objects.bulk_create(
+            [
+                through(track_id=track_id, artist_id=artist_id)
+                for track_id, artist_ids in track_artists.items() for artist_id in artist_ids
+            ],
+            batch_size=BULK_BATCH_SIZE,
+            ignore_conflicts=True
+        )
+
+    def import_tracks(self, tracks_info):
+        """
+        Imports the Spotify tracks (see get_item_track) and returns {spotify_id: track id}.
+        The first artist of a track is its artist, the others are additional main artists.
+        """
+        tracks_info = {track_info['id']: track_info for track_info in tracks_info if track_info}
+        if not tracks_info:
+            return {}
+
+        with transaction.atomic():
+            artist_ids = self.upsert_artists({
+                artist_info['id']: artist_info
+                for track_info in tracks_info.values() for artist_info in track_info['artists'] if artist_info.get('id')
+            })
+            track_artists = {
+                spotify_id: [artist_ids[artist_info['id']] for artist_info in track_info['artists'] if artist_info.get('id')]
+                for spotify_id, track_info in tracks_info.items()
+            }
+            track_ids = self.upsert_tracks({
+                spotify_id: get_track_values(track_info, track_artists[spotify_id][0])
+                for spotify_id, track_info in tracks_info.items() if track_artists[spotify_id]
+            })
+            self.set_additional_artists({
+                track_ids[spotify_id]: artist_ids[1:]
+                for spotify_id, artist_ids in track_artists.items() if len(artist_ids) > 1
+            })
+        return track_ids
+
+
+class PlaylistSync:
+    """
+    Incremental sync of SpotifyPlaylist records. A playlist whose snapshot_id did not
+    change since the last sync costs a single request. Otherwise its items are diffed
+    against the stored positions: added tracks are imported (see PlaylistImporter),
+    removed ones deleted and moved ones repositioned, the others are not written.
+    """
+
+    def __init__(self, spotify):
+        self.spotify = spotify
+        self.importer = PlaylistImporter()
+        self.stats = Counter()
+
+    def get_tracks_info(self, spotify_ids):
+        spotify_ids = list(spotify_ids)
+        for i in range(0, len(spotify_ids), SPOTIFY_TRACKS_BATCH):
+            yield from self.spotify.tracks(spotify_ids[i:i + SPOTIFY_TRACKS_BATCH])['tracks']
+
+    def sync(self, playlist, force=False):
+        """
+        Syncs the playlist, False when it did not change since the last sync
+        """
+        playlist_info = self.spotify.playlist(playlist.spotify_id, fields='name,snapshot_id')
+        if playlist_info['snapshot_id'] == playlist.snapshot_id and not force:
+            self.stats['playlists_unchanged'] += 1
+            return False
+
+        # {spotify_id: (position, added)}, the first occurrence of repeated tracks
+        positions = {}
+        for position, item in enumerate(get_playlist_items(self.spotify, playlist.spotify_id, PLAYLIST_ITEM_FIELDS)):
+            track_info = get_item_track(item)
+            if track_info and track_info['id'] not in positions:
+                added = parse_datetime(item['added_at']) if item.get('added_at') else None
+                positions[track_info['id']] = (position, added)
+
+        stored = {
+            playlist_track.track.spotify_id: playlist_track
+            for playlist_track in SpotifyPlaylistTrack.objects.filter(playlist=playlist).select_related('track').only(
+                'id', 'position', 'track_id', 'track__spotify_id'
+            )
+        }
+        # requested before the transaction, a slow Spotify does not keep it open
+        tracks_info = list(self.get_tracks_info(spotify_id for spotify_id in positions if spotify_id not in stored))
+
+        with transaction.atomic():
+            removed = [playlist_track.id for spotify_id, playlist_track in stored.items() if spotify_id not in positions]
+            SpotifyPlaylistTrack.objects.filter(id__in=removed).delete()
+
+            moved = []
+            for spotify_id, playlist_track in stored.items():
+                if spotify_id in positions and playlist_track.position != positions[spotify_id][0]:
+                    playlist_track.position = positions[spotify_id][0]
+                    moved.append(playlist_track)
+            SpotifyPlaylistTrack.objects.bulk_update(moved, ['position'], batch_size=BULK_BATCH_SIZE)
+
+            track_ids = self.importer.import_tracks(get_item_track({'track': track_info}) for track_info in tracks_info)
+            created = SpotifyPlaylistTrack.objects.bulk_create(
+                [
+                    SpotifyPlaylistTrack(playlist=playlist, track_id=track_id, position=positions[spotify_id][0], added=positions[spotify_id][1])
+                    for spotify_id, track_id in track_ids.items()
+                ],
+                batch_size=BULK_BATCH_SIZE,
+                ignore_conflicts=True
+            )
+
+            playlist.name = playlist_info['name']
+            playlist.snapshot_id = playlist_info['snapshot_id']
+            playlist.synced = timezone.now()
+            playlist.save(update_fields=['name', 'snapshot_id', 'synced', 'updated'])
+
+        self.stats['playlists_synced'] += 1
+        self.stats['added'] += len(created)
+        self.stats['removed'] += len(removed)
+        self.stats['moved'] += len(moved)
+        return True
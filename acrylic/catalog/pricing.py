@@ -0,0 +1,115 @@
+import uuid
+from django.core.cache import cache
+
+
+PRICE_MATRIX_VERSION_KEY = 'catalog:price-matrix:version'
+PRICE_MATRIX_TIMEOUT = 60 * 60 * 24  # 1 day, matrices of old versions just expire
+
+USE_TYPES = ['single_use', 'subscription']
+
+# max tracks priced in a single quote
+MAX_QUOTE_TRACKS = 500
+
+# per process copy of the current matrix: {'version': ..., 'matrix': ...}
+_local_matrix = {}
+
+
+def build_price_matrix():
+    """
+    Price x tier matrix: {'default': price_id, 'prices': {price_id: {tier_id: {use_type: amount}}}}
+    """
+    from catalog.models import Price, TierPrice
+
+    default_price_id = Price.objects.filter(default=True).order_by('order').values_list('id', flat=True).first()
+    prices = {}
+    tier_prices = TierPrice.objects.values_list('price_id', 'tier_id', 'single_use_price', 'subscription_price')
+    for price_id, tier_id, single_use_price, subscription_price in tier_prices:
+        prices.setdefault(price_id, {})[tier_id] = {
+            'single_use': single_use_price,
+            'subscription': subscription_price,
+        }
+    return {'default': default_price_id, 'prices': prices}
+
+
+def get_price_matrix_version():
+    version = cache.get(PRICE_MATRIX_VERSION_KEY)
+    if version is None:
+        cache.add(PRICE_MATRIX_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(PRICE_MATRIX_VERSION_KEY)
+    return version
+
+
+def get_price_matrix():
+    """
+    Current price matrix: from the process memory when its version is still
+    current, then from the shared cache, built from the database otherwise.
+    """
+    version = get_price_matrix_version()
+    if version is not None and _local_matrix.get('version') == version:
+        return _local_matrix['matrix']
+
+    cache_key = f'catalog:price-matrix:{version}'
+    matrix = cache.get(cache_key)
+    if matrix is None:
+        matrix = build_price_matrix()
+        cache.set(cache_key, matrix, PRICE_MATRIX_TIMEOUT)
+
+    _local_matrix.update(version=version, matrix=matrix)
+    return matrix
+
+
+def get_request_price_matrix(request):
+    """
+    Price matrix read once per request: views and serializers pricing several tracks
+    pass it as matrix=, so the version is not read from the cache for each track
+    """
+    if not hasattr(request, '_price_matrix'):
+        request._price_matrix = get_price_matrix()
+    return request._price_matrix
+
+
+def invalidate_price_matrix():
+    """ called when a Price, TierPrice or Tier changes """
+    _local_matrix.clear()
+    cache.set(PRICE_MATRIX_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def get_track_price(track, tier_id, use_type, matrix=None):
+    """
+    Amount for a track, buyer tier and use type. Pass a matrix when pricing
+    many tracks (see get_request_price_matrix), the cache is read on each call otherwise.
+    """
+    from catalog.models import Price, TierPrice
+
+    if matrix is None:
+        matrix = get_price_matrix()
+
+    price_id = track.price_id or matrix['default']
+    if price_id is None:
+        raise Price.DoesNotExist('No default price')
+    try:
+        return matrix['prices'][price_id][tier_id][use_type]
+    except KeyError:
+        raise TierPrice.DoesNotExist(f'No tier price for price {price_id} and tier {tier_id}')
+
+
+def quote_tracks(tracks, tier_id, use_type, matrix=None):
+    """
+    Prices a list of tracks for a buyer tier reading the price matrix once.
+    Returns [(track, amount)] and the total, amount is None when the track has no price for the tier.
+    """
+    from catalog.models import Price, TierPrice
+
+    if matrix is None:
+        matrix = get_price_matrix()
+    items = []
+    total = 0
+    for track in tracks:
+        try:
+            amount = get_track_price(track, tier_id, use_type, matrix)
+        except (Price.DoesNotExist, TierPrice.DoesNotExist):
+            amount = None
+        else:
+            total += amount
+        items.append((track, amount))
+    return items, total
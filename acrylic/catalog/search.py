@@ -0,0 +1,103 @@
+import re
+import uuid
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, FloatField, OuterRef, Q, Subquery
+from django.db.models.functions import Cast
+from rest_framework import filters
+from taggit.models import TaggedItem
+
+from catalog.validators import isrc_pattern
+
+
+# language neutral config: tracks are both EN and ES, so no stemming
+SEARCH_CONFIG = 'simple'
+
+search_token_pattern = re.compile(r'\w+')
+
+
+def build_search_vector():
+    """
+    Weighted search vector for a Track queryset update:
+    name (A), artist name (B), tags and genres (C), lyrics (D)
+    """
+    from artist.models import Artist
+    from catalog.models import Track
+
+    artist_name = Artist.objects.filter(pk=OuterRef('artist_id')).values('name')[:1]
+    genre_names = Track.genres.through.objects.filter(
+        track_id=OuterRef('pk')
+    ).values('track_id').annotate(names=StringAgg('genre__name', ' ')).values('names')
+    tag_names = TaggedItem.objects.filter(
+        content_type__app_label='catalog',
+        content_type__model='track',
+        object_id=OuterRef('pk')
+    ).values('object_id').annotate(names=StringAgg('tag__name', ' ')).values('names')
+
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(Subquery(artist_name), weight='B', config=SEARCH_CONFIG)
+        + SearchVector(Subquery(tag_names), weight='C', config=SEARCH_CONFIG)
+        + SearchVector(Subquery(genre_names), weight='C', config=SEARCH_CONFIG)
+        + SearchVector('lyrics', weight='D', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(queryset):
+    """
+    Refresh the search vector of the given tracks in a single UPDATE statement.
+    Postgres only, skipped on other databases (e.g. the local sqlite).
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return 0
+    return queryset.order_by().update(search_vector=build_search_vector())
+
+
+def build_search_query(terms):
+    """
+    Prefix query so partial words match while the user types, e.g. "oye cari" -> "oye:* & cari:*"
+    """
+    tokens = search_token_pattern.findall(' '.join(terms).lower())
+    if not tokens:
+        return None
+    return SearchQuery(' & '.join(f'{token}:*' for token in tokens), search_type='raw', config=SEARCH_CONFIG)
+
+
+class TrackSearchFilter(filters.SearchFilter):
+    """
+    Full-text search over the GIN indexed Track.search_vector, ranked with SearchRank.
+    Keeps the ?search= contract: exact UUID and ISRC matches are still supported.
+    Off Postgres (e.g. the local sqlite) it falls back to the plain SearchFilter.
+    """
+    fallback_search_fields = ['=uuid', '=isrc', 'name', 'artist__name']
+
+    def get_search_fields(self, view, request):
+        return self.fallback_search_fields
+
+    def filter_queryset(self, request, queryset, view):
+        if connections[queryset.db].vendor != 'postgresql':
+            return super().filter_queryset(request, queryset, view)
+
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        if len(terms) == 1:
+            try:
+                return queryset.filter(uuid=uuid.UUID(terms[0]))
+            except ValueError:
+                pass
+
+        query = build_search_query(terms)
+        if query is None:
+            return queryset.none()
+
+        conditions = Q(search_vector=query)
+        if len(terms) == 1 and isrc_pattern.match(terms[0].upper()):
+            conditions |= Q(isrc=terms[0].upper())
+
+        return queryset.filter(conditions).annotate(
+            # double precision so the rank can be used as a pagination keyset
+            search_rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+        ).order_by('-search_rank', '-id')
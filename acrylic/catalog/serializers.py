@@ -1,27 +1,44 @@
 from rest_framework import serializers
 from taggit.models import Tag
+from artist.models import Artist
 from catalog.models import Distributor, Genre, Price, TierPrice, Track, SyncList, SyncListTrack
 from buyer.serializers import TierSerializer
+from common.api.serializers import SparseFieldsMixin
+from catalog.pricing import USE_TYPES, MAX_QUOTE_TRACKS
 
-class DistributorSerializer(serializers.ModelSerializer):
+class DistributorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Distributor
         fields = ['uuid', 'name']
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['name', 'slug']
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class TrackTagSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    track_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Tag
+        fields = ['name', 'slug', 'track_count']
+
+
+class GenreSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Genre
         fields = ['uuid', 'name', 'code']
 
 
-class TierPriceSerializer(serializers.ModelSerializer):
+class GenreListSerializer(GenreSerializer):
+    # not nested in track / synclist payloads: the counter changes without bumping their updated
+    class Meta(GenreSerializer.Meta):
+        fields = GenreSerializer.Meta.fields + ['track_count']
+
+
+class TierPriceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     tier = TierSerializer(many=False, read_only=True)
 
     class Meta:
@@ -29,24 +46,31 @@ class TierPriceSerializer(serializers.ModelSerializer):
         fields = ['tier', 'single_use_price', 'subscription_price']
 
 
-class PriceSerializer(serializers.ModelSerializer):
+class PriceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     tier_prices = TierPriceSerializer(many=True, read_only=True)
     min_price = serializers.SerializerMethodField()
     max_price = serializers.SerializerMethodField()
+    min_subscription_price = serializers.SerializerMethodField()
+    max_subscription_price = serializers.SerializerMethodField()
 
     class Meta:
         model = Price
-        fields = ['uuid', 'name', 'description', 'max_artist_tracks', 'tier_prices', 'default', 'active', 'order', 'min_price', 'max_price']
-        queryset = Price.objects.prefetch_related('tier_prices', 'tier_prices__tier')
+        fields = [
+            'uuid', 'name', 'description', 'max_artist_tracks', 'tier_prices', 'default', 'active', 'order',
+            'min_price', 'max_price', 'min_subscription_price', 'max_subscription_price'
+        ]
 
     def get_min_price(self, obj):
-        #lowest_price = obj.tier_prices.order_by('subscription_price').first()
-        lowest_price = obj.tier_prices.order_by('single_use_price').first()
-        return lowest_price.single_use_price
-    
+        return obj.get_price_range('min_single_use_price')
+
     def get_max_price(self, obj):
-        highest_price = obj.tier_prices.order_by('-single_use_price').first()
-        return highest_price.single_use_price
+        return obj.get_price_range('max_single_use_price')
+
+    def get_min_subscription_price(self, obj):
+        return obj.get_price_range('min_subscription_price')
+
+    def get_max_subscription_price(self, obj):
+        return obj.get_price_range('max_subscription_price')
 
 
 class MyPriceSerializer(PriceSerializer):
@@ -55,14 +79,13 @@ class MyPriceSerializer(PriceSerializer):
     class Meta:
         model = Price
         fields = PriceSerializer.Meta.fields + ['available_tracks']
-        queryset = PriceSerializer.Meta.queryset
 
     def get_available_tracks(self, obj):
         artist = self.context['request'].user.artist
-        return obj.get_available_tracks(artist)
+        return obj.get_available_tracks(artist, self.context.get('artist_track_counts'))
 
 
-class MyTrackSerializer(serializers.ModelSerializer):
+class MyTrackSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     artist = serializers.SlugRelatedField(slug_field='uuid', read_only=True)
     distributor = serializers.SlugRelatedField(slug_field='uuid', queryset=Distributor.objects.all(), required=False)
     tags = TagSerializer(many=True, required=False)
@@ -74,7 +97,7 @@ class MyTrackSerializer(serializers.ModelSerializer):
     class Meta:
         model = Track
         # fields = '__all__'  # Lists all fields from the Track model. Adjust as needed.
-        exclude = ['id']
+        exclude = ['id', 'search_vector', 'enrichment_pending', 'enrichment_attempts']
         extra_kwargs = {
             'file_mp3': {'required': False},
             'file_wav': {'required': False},
@@ -83,11 +106,30 @@ class MyTrackSerializer(serializers.ModelSerializer):
         }
 
 
+class MyTrackBulkItemSerializer(serializers.ModelSerializer):
+    """
+    Track of a bulk create. Related objects are given by UUID (tags by name)
+    and resolved for the whole batch at once, see MyTrackViewSet.bulk
+    """
+    distributor = serializers.UUIDField(required=False, allow_null=True)
+    price = serializers.UUIDField()
+    genres = serializers.ListField(child=serializers.UUIDField(), required=False, default=list)
+    tags = serializers.ListField(child=serializers.CharField(max_length=100), required=False, default=list)
+
+    class Meta:
+        model = Track
+        fields = [
+            'isrc', 'name', 'duration', 'distributor', 'other_distributor', 'other_distributor_email',
+            'released', 'is_cover', 'is_remix', 'is_instrumental', 'is_explicit', 'bpm',
+            'language', 'lyrics', 'price', 'genres', 'tags',
+        ]
+
+
 class MyTrackReadSerializer(MyTrackSerializer):
     price = PriceSerializer(many=False, read_only=True)
 
 
-class TrackSummarySerializer(serializers.ModelSerializer):
+class TrackSummarySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     artist = serializers.SlugRelatedField(slug_field='name', read_only=True)
     class Meta:
         model = Track
@@ -97,13 +139,27 @@ class TrackSummarySerializer(serializers.ModelSerializer):
         ]
 
 
-class TrackSerializer(serializers.ModelSerializer):
+class TrackArtistSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Artist
+        fields = ['uuid', 'name', 'slug', 'image']
+
+
+class TrackSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     artist = serializers.SlugRelatedField(slug_field='uuid', read_only=True)
     distributor = serializers.SlugRelatedField(slug_field='uuid', read_only=True)
     tags = TagSerializer(many=True)
     genres = GenreSerializer(many=True)
     price = serializers.SlugRelatedField(slug_field='uuid', read_only=True)
 
+    expandable_fields = {
+        'artist': (TrackArtistSerializer, {}),
+        'distributor': (DistributorSerializer, {}),
+        'price': (PriceSerializer, {}),
+        'additional_main_artists': (TrackArtistSerializer, {'many': True}),
+        'featured_artists': (TrackArtistSerializer, {'many': True}),
+    }
+
     class Meta:
         model = Track
         fields = [
@@ -118,7 +174,7 @@ class TrackSerializer(serializers.ModelSerializer):
         return [genre.name for genre in obj.genres.all()]
 
 
-class SyncListTrackSerializer(serializers.ModelSerializer):
+class SyncListTrackSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     track = TrackSerializer(read_only=True)
     
     class Meta:
@@ -126,7 +182,7 @@ class SyncListTrackSerializer(serializers.ModelSerializer):
         fields = ['track', 'order']
 
 
-class SyncListSerializer(serializers.ModelSerializer):
+class SyncListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     tracks = SyncListTrackSerializer(source='synclisttrack_set', many=True, read_only=True)
     artist = serializers.SlugRelatedField(slug_field='uuid', read_only=True)
 
@@ -135,7 +191,7 @@ class SyncListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = SyncList
-        fields = ['uuid', 'artist', 'name', 'cover_image', 'background_image', 'description', 'order', 'pinned', 'tracks', 'genres', 'tags']
+        fields = ['uuid', 'artist', 'name', 'cover_image', 'background_image', 'description', 'order', 'pinned', 'track_count', 'tracks', 'genres', 'tags']
 
     def create(self, validated_data):
         # Ensure the SyncList is associated with the current artist.
@@ -145,9 +201,34 @@ class SyncListSerializer(serializers.ModelSerializer):
     def get_genres(self, obj):
         # Assuming `get_tags()` returns a queryset of Tag instances
         tags = obj.get_genres()
-        return GenreSerializer(tags, many=True, context=self.context).data
+        return GenreSerializer(tags, many=True, context=self.context, sparse_path=self.get_nested_path('genres')).data
     
     def get_tags(self, obj):
         # Assuming `get_tags()` returns a queryset of Tag instances
         tags = obj.get_tags()
-        return TagSerializer(tags, many=True, context=self.context).data
+        return TagSerializer(tags, many=True, context=self.context, sparse_path=self.get_nested_path('tags')).data
+
+
+class QuoteRequestSerializer(serializers.Serializer):
+    tracks = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=MAX_QUOTE_TRACKS)
+    use_type = serializers.ChoiceField(choices=USE_TYPES)
+
+
+class QuoteTrackSerializer(serializers.Serializer):
+    uuid = serializers.UUIDField()
+    name = serializers.CharField()
+    price = serializers.DecimalField(max_digits=8, decimal_places=2, allow_null=True)
+
+
+class QuoteSerializer(serializers.Serializer):
+    use_type = serializers.CharField()
+    tier = serializers.CharField()
+    tracks = QuoteTrackSerializer(many=True)
+    not_found = serializers.ListField(child=serializers.UUIDField())
+    count = serializers.IntegerField()
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class SyncListTrackItemSerializer(serializers.Serializer):
+    track_uuid = serializers.UUIDField()
+    order = serializers.IntegerField(required=False, default=0, min_value=0)
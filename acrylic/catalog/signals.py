@@ -0,0 +1,204 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from taggit.models import Tag
+from artist.models import Artist
+from buyer.models import Tier
+from common.cache import register_cache_invalidation
+from catalog.models import Distributor, Genre, Price, TierPrice, Track, SyncList, SyncListTrack
+from catalog.counters import get_track_tagged_items, update_genre_counts, update_synclist_counts, update_tag_counts, update_track_counters
+from catalog.pricing import invalidate_price_matrix
+from catalog.search import update_search_vectors
+from catalog.tags import track_has_tags
+
+
+# public reference endpoints with cached responses
+register_cache_invalidation(Genre, Distributor, Price, TierPrice, Tier)
+
+# fields of each model in the track search vectors (see catalog.search.build_search_vector)
+SEARCH_FIELDS = {
+    Track: ['name', 'lyrics', 'artist_id'],
+    Artist: ['name'],
+    Genre: ['name'],
+    Tag: ['name'],
+}
+
+
+@receiver(pre_save, sender=Track)
+@receiver(pre_save, sender=Artist)
+@receiver(pre_save, sender=Genre)
+@receiver(pre_save, sender=Tag)
+def searchable_saving(sender, instance, update_fields=None, **kwargs):
+    """ compares the searchable fields with the stored row, so unchanged saves skip the vectors """
+    fields = SEARCH_FIELDS[sender]
+    if update_fields is not None and not {field.removesuffix('_id') for field in fields}.intersection(
+        field.removesuffix('_id') for field in update_fields
+    ):
+        changed = False
+    elif instance._state.adding:
+        changed = True
+    else:
+        stored = sender._base_manager.filter(pk=instance.pk).values_list(*fields).first()
+        changed = stored != tuple(getattr(instance, field) for field in fields)
+    instance._search_fields_changed = changed
+
+
+def search_fields_changed(instance):
+    return getattr(instance, '_search_fields_changed', True)
+
+
+@receiver(post_save, sender=Track)
+def track_saved(sender, instance, **kwargs):
+    """ refresh the search vector when searchable fields change """
+    if search_fields_changed(instance):
+        update_search_vectors(Track.objects.filter(pk=instance.pk))
+
+
+@receiver(m2m_changed, sender=Track.genres.through)
+@receiver(m2m_changed, sender=Track.tags.through)
+def track_terms_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """ genres or tags added to / removed from a track """
+    if action not in ['post_add', 'post_remove', 'post_clear']:
+        return
+    if isinstance(instance, Track):
+        tracks = Track.objects.filter(pk=instance.pk)
+    elif isinstance(instance, Genre) and pk_set:
+        # reverse side, e.g. genre.tracks.add(...)
+        tracks = Track.objects.filter(pk__in=pk_set)
+    else:
+        return
+    update_search_vectors(tracks)
+    # the payload changed: new ETag / Last-Modified
+    tracks.update(updated=timezone.now())
+
+
+@receiver(m2m_changed, sender=Track.additional_main_artists.through)
+@receiver(m2m_changed, sender=Track.featured_artists.through)
+def track_artists_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ['post_add', 'post_remove', 'post_clear']:
+        return
+    if not reverse:
+        Track.objects.filter(pk=instance.pk).update(updated=timezone.now())
+    elif pk_set:
+        Track.objects.filter(pk__in=pk_set).update(updated=timezone.now())
+
+
+@receiver(post_save, sender=Artist)
+def artist_renamed(sender, instance, created, **kwargs):
+    if not created and search_fields_changed(instance):
+        update_search_vectors(Track.objects.filter(artist=instance))
+
+
+@receiver(post_save, sender=Genre)
+def genre_renamed(sender, instance, created, **kwargs):
+    if not created and search_fields_changed(instance):
+        tracks = Track.objects.filter(genres=instance)
+        update_search_vectors(tracks)
+        tracks.update(updated=timezone.now())
+
+
+@receiver(post_save, sender=Tag)
+def tag_renamed(sender, instance, created, **kwargs):
+    if not created and search_fields_changed(instance):
+        tracks = Track.objects.filter(track_has_tags(tag=instance))
+        update_search_vectors(tracks)
+        tracks.update(updated=timezone.now())
+
+
+@receiver(post_save, sender=SyncListTrack)
+def synclist_track_saved(sender, instance, created, **kwargs):
+    """ track added or reordered: new synclist ETag / Last-Modified """
+    SyncList(pk=instance.synclist_id).touch()
+    if created:
+        update_synclist_counts([instance.synclist_id])
+
+
+@receiver(post_delete, sender=SyncListTrack)
+def synclist_track_deleted(sender, instance, origin=None, **kwargs):
+    """
+    single membership deleted, e.g. from the admin inline or the shell. Queryset deletes
+    (remove_tracks, tracks.remove) and the Track / SyncList cascades update the synclist once
+    """
+    if isinstance(origin, SyncListTrack):
+        SyncList(pk=instance.synclist_id).touch()
+        update_synclist_counts([instance.synclist_id])
+
+
+@receiver(m2m_changed, sender=SyncList.tracks.through)
+def synclist_tracks_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """ synclist.tracks.add/remove/clear: SyncList.track_count and ETag / Last-Modified """
+    if reverse and action == 'pre_clear':
+        # track.synclists.clear()
+        instance._cleared_synclist_ids = list(instance.synclists.values_list('pk', flat=True))
+        return
+    if action not in ['post_add', 'post_remove', 'post_clear']:
+        return
+    if not reverse:
+        synclist_ids = [instance.pk]
+    elif action == 'post_clear':
+        synclist_ids = getattr(instance, '_cleared_synclist_ids', [])
+    else:
+        synclist_ids = list(pk_set or [])
+    if synclist_ids:
+        SyncList.objects.filter(pk__in=synclist_ids).update(updated=timezone.now())
+        update_synclist_counts(synclist_ids)
+
+
+@receiver(pre_delete, sender=Track)
+def track_deleting(sender, instance, **kwargs):
+    """
+    Synclist memberships are removed by the cascade, the synclists are bumped
+    here once (see synclist_track_deleted).
+    """
+    SyncList.objects.filter(synclisttrack__track=instance).update(updated=timezone.now())
+    # the cascade skips m2m_changed: counters are updated once the rows are gone
+    instance._counted_ids = {
+        'genre_ids': list(Track.genres.through.objects.filter(track_id=instance.pk).values_list('genre_id', flat=True)),
+        'tag_ids': list(get_track_tagged_items().filter(object_id=instance.pk).values_list('tag_id', flat=True)),
+        'synclist_ids': list(SyncListTrack.objects.filter(track_id=instance.pk).values_list('synclist_id', flat=True)),
+    }
+
+
+@receiver(post_delete, sender=Track)
+def track_deleted(sender, instance, **kwargs):
+    update_track_counters(**getattr(instance, '_counted_ids', {}))
+
+
+@receiver(m2m_changed, sender=Track.genres.through)
+def track_genres_counted(sender, instance, action, reverse, pk_set, **kwargs):
+    """ Genre.track_count """
+    if reverse:
+        # genre.tracks.add(...)
+        if action in ['post_add', 'post_remove', 'post_clear']:
+            update_genre_counts([instance.pk])
+    elif action == 'pre_clear':
+        instance._cleared_genre_ids = list(instance.genres.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        update_genre_counts(getattr(instance, '_cleared_genre_ids', []))
+    elif action in ['post_add', 'post_remove'] and pk_set:
+        update_genre_counts(pk_set)
+
+
+@receiver(m2m_changed, sender=Track.tags.through)
+def track_tags_counted(sender, instance, action, pk_set, **kwargs):
+    """ TagCounter, the taggit through model is shared with Artist tags """
+    if not isinstance(instance, Track):
+        return
+    if action == 'pre_clear':
+        instance._cleared_tag_ids = list(instance.tags.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        update_tag_counts(getattr(instance, '_cleared_tag_ids', []))
+    elif action in ['post_add', 'post_remove'] and pk_set:
+        update_tag_counts(pk_set)
+
+
+@receiver(post_save, sender=Price)
+@receiver(post_delete, sender=Price)
+@receiver(post_save, sender=TierPrice)
+@receiver(post_delete, sender=TierPrice)
+@receiver(post_save, sender=Tier)
+@receiver(post_delete, sender=Tier)
+def prices_changed(sender, **kwargs):
+    """ new price matrix version once the change is committed """
+    transaction.on_commit(invalidate_price_matrix)
@@ -0,0 +1,274 @@
+import threading
+import time
+import uuid
+import warnings
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from scipy import sparse
+from taggit.models import TaggedItem
+
+
+FLAG_FIELDS = ['is_cover', 'is_remix', 'is_instrumental', 'is_explicit']
+NUMERIC_FIELDS = ['bpm', 'duration', 'spotify_popularity']
+TRACK_FIELDS = ['id', 'updated', 'language'] + FLAG_FIELDS + NUMERIC_FIELDS
+
+# built by the workers (see catalog.tasks.refresh_similarity_index) and loaded by the web processes
+SIMILARITY_INDEX_KEY = 'catalog:similarity-index'
+SIMILARITY_INDEX_VERSION_KEY = 'catalog:similarity-index:version'
+
+# weight of each feature block in the similarity
+FEATURE_WEIGHTS = {
+    'genres': 1.0,
+    'tags': 0.7,
+    'language': 0.4,
+    'flags': 0.3,
+    'numeric': 0.5,
+}
+
+
+def get_numeric_values(tracks):
+    """
+    NUMERIC_FIELDS of the given track values as a float matrix, NaN when missing
+    """
+    offset = 3 + len(FLAG_FIELDS)
+    return np.array(
+        [[np.nan if value is None else value for value in track[offset:]] for track in tracks],
+        dtype=np.float64
+    ).reshape(len(tracks), len(NUMERIC_FIELDS))
+
+
+def get_track_terms(track_ids=None):
+    """
+    {track_id: [genre ids]} and {track_id: [tag ids]}, for every track when track_ids is None
+    """
+    from catalog.models import Track
+
+    genre_links = Track.genres.through.objects.all()
+    tag_links = TaggedItem.objects.filter(content_type__app_label='catalog', content_type__model='track')
+    if track_ids is not None:
+        genre_links = genre_links.filter(track_id__in=track_ids)
+        tag_links = tag_links.filter(object_id__in=track_ids)
+
+    genres, tags = {}, {}
+    for track_id, genre_id in genre_links.values_list('track_id', 'genre_id'):
+        genres.setdefault(track_id, []).append(genre_id)
+    for track_id, tag_id in tag_links.values_list('object_id', 'tag_id'):
+        tags.setdefault(track_id, []).append(tag_id)
+    return genres, tags
+
+
+class TrackSimilarityIndex:
+    """
+    Sparse feature matrix of the catalog with one L2 normalized row per track,
+    so cosine similarity against every track is a single matrix-vector product.
+
+    Feature blocks: one-hot genres, tags and language, flags, and standardized BPM,
+    duration and Spotify popularity, each one normalized and weighted (FEATURE_WEIGHTS).
+    Tracks updated since the last build are re-encoded in place, the matrix is only
+    rebuilt when tracks are deleted or new genres / tags show up.
+    """
+
+    def __init__(self):
+        self.matrix = None
+        self.ids = None
+        self.rows = {}
+        self.built_at = None
+        self.version = None
+
+    def encode(self, tracks, genres, tags):
+        """
+        Feature rows of the given track values (TRACK_FIELDS), None when a genre
+        or tag is not in the vocabulary of the current build
+        """
+        rows, cols, values = [], [], []
+
+        def add(row, columns, weight):
+            # one-hot block, normalized and weighted
+            for column in columns:
+                rows.append(row)
+                cols.append(column)
+                values.append(weight / np.sqrt(len(columns)))
+
+        for row, track in enumerate(tracks):
+            for links, columns, block in [(genres, self.genre_columns, 'genres'), (tags, self.tag_columns, 'tags')]:
+                term_ids = links.get(track[0], [])
+                if any(term_id not in columns for term_id in term_ids):
+                    return None
+                add(row, [columns[term_id] for term_id in term_ids], FEATURE_WEIGHTS[block])
+            if track[2] in self.language_columns:
+                add(row, [self.language_columns[track[2]]], FEATURE_WEIGHTS['language'])
+            flags = track[3:3 + len(FLAG_FIELDS)]
+            add(row, [self.blocks['flags'].start + i for i, flag in enumerate(flags) if flag], FEATURE_WEIGHTS['flags'])
+
+        # standardized numeric features, missing values at the mean
+        numeric = (get_numeric_values(tracks) - self.numeric_mean) / self.numeric_std
+        numeric = np.nan_to_num(np.clip(numeric, -3, 3) / 3) * FEATURE_WEIGHTS['numeric']
+        numeric_rows, numeric_cols = np.nonzero(numeric)
+
+        matrix = sparse.csr_matrix(
+            (
+                np.concatenate([values, numeric[numeric_rows, numeric_cols]]),
+                (np.concatenate([rows, numeric_rows]), np.concatenate([cols, numeric_cols + self.blocks['numeric'].start])),
+            ),
+            shape=(len(tracks), self.width), dtype=np.float32
+        )
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        return sparse.diags(1 / np.where(norms > 0, norms, 1).astype(np.float32)).dot(matrix).tocsr()
+
+    def build(self):
+        from catalog.models import Genre, Track
+
+        tracks = list(Track.objects.order_by('id').values_list(*TRACK_FIELDS))
+        genres, tags = get_track_terms()
+
+        genre_ids = list(Genre.objects.order_by('id').values_list('id', flat=True))
+        tag_ids = sorted({tag_id for track_tags in tags.values() for tag_id in track_tags})
+        languages = Track.Language.values
+
+        # column range of each feature block
+        sizes = [
+            ('genres', len(genre_ids)), ('tags', len(tag_ids)), ('language', len(languages)),
+            ('flags', len(FLAG_FIELDS)), ('numeric', len(NUMERIC_FIELDS)),
+        ]
+        self.blocks, offset = {}, 0
+        for block, size in sizes:
+            self.blocks[block] = slice(offset, offset + size)
+            offset += size
+        self.width = offset
+        self.genre_columns = {genre_id: self.blocks['genres'].start + i for i, genre_id in enumerate(genre_ids)}
+        self.tag_columns = {tag_id: self.blocks['tags'].start + i for i, tag_id in enumerate(tag_ids)}
+        self.language_columns = {code: self.blocks['language'].start + i for i, code in enumerate(languages)}
+
+        numeric = get_numeric_values(tracks)
+        with warnings.catch_warnings():
+            # columns without any value
+            warnings.simplefilter('ignore', RuntimeWarning)
+            self.numeric_mean = np.nan_to_num(np.nanmean(numeric, axis=0))
+            std = np.nan_to_num(np.nanstd(numeric, axis=0))
+        self.numeric_std = np.where(std > 0, std, 1)
+
+        self.matrix = self.encode(tracks, genres, tags)
+        self.ids = np.array([track[0] for track in tracks], dtype=np.int64)
+        self.rows = {track_id: row for row, track_id in enumerate(self.ids.tolist())}
+        self.built_at = max((track[1] for track in tracks), default=None)
+        return True
+
+    def refresh(self):
+        """
+        Re-encodes the tracks updated since the last build (genre / tag changes bump Track.updated).
+        Returns whether the index changed.
+        """
+        from catalog.models import Track
+
+        if self.matrix is None or self.built_at is None:
+            return self.build()
+
+        # >= as rows can share the last timestamp, re-encoding twice is harmless
+        tracks = list(Track.objects.filter(updated__gte=self.built_at).order_by('id').values_list(*TRACK_FIELDS))
+        new_ids = [track[0] for track in tracks if track[0] not in self.rows]
+        if Track.objects.count() != len(self.rows) + len(new_ids):
+            # deleted tracks
+            return self.build()
+        if not tracks:
+            return False
+
+        genres, tags = get_track_terms([track[0] for track in tracks])
+        matrix = self.encode(tracks, genres, tags)
+        if matrix is None:
+            # new genres or tags
+            return self.build()
+
+        existing = [row for row, track in enumerate(tracks) if track[0] in self.rows]
+        targets = [self.rows[tracks[row][0]] for row in existing]
+        if not new_ids and (self.matrix[targets] != matrix[existing]).nnz == 0:
+            # only the rows sharing the last timestamp, unchanged: the saved index is kept
+            return False
+
+        # the updated rows are cleared and their new encoding added in place, no row assignments on the CSR matrix
+        kept = np.ones(len(self.ids), dtype=np.float32)
+        kept[targets] = 0
+        placement = sparse.csr_matrix(
+            (np.ones(len(existing), dtype=np.float32), (targets, existing)), shape=(len(self.ids), len(tracks))
+        )
+        self.matrix = (sparse.diags(kept).dot(self.matrix) + placement.dot(matrix)).tocsr()
+        if new_ids:
+            appended = [row for row, track in enumerate(tracks) if track[0] not in self.rows]
+            self.rows.update({track_id: len(self.ids) + i for i, track_id in enumerate(new_ids)})
+            self.matrix = sparse.vstack([self.matrix, matrix[appended]], format='csr')
+            self.ids = np.concatenate([self.ids, np.array(new_ids, dtype=np.int64)])
+        self.built_at = max(self.built_at, max(track[1] for track in tracks))
+        return True
+
+    def save(self):
+        """
+        Shares the index with the web processes, which reload it when the version changes
+        """
+        self.version = uuid.uuid4().hex
+        cache.set(SIMILARITY_INDEX_KEY, self, None)
+        cache.set(SIMILARITY_INDEX_VERSION_KEY, self.version, None)
+
+    @classmethod
+    def load(cls):
+        """
+        Last saved index, None before the first build
+        """
+        return cache.get(SIMILARITY_INDEX_KEY)
+
+    def similar(self, track_id, limit, candidate_ids=None):
+        """
+        [(track_id, score)] of the most similar tracks, best first. candidate_ids
+        restricts the results after scoring, e.g. to the tracks matching TrackFilter.
+        """
+        row = self.rows.get(track_id)
+        if row is None:
+            return []
+
+        scores = self.matrix.dot(self.matrix[row].T).toarray().ravel()
+        if candidate_ids is not None:
+            mask = np.zeros(len(scores), dtype=bool)
+            mask[[self.rows[candidate_id] for candidate_id in candidate_ids if candidate_id in self.rows]] = True
+            scores[~mask] = -np.inf
+        scores[row] = -np.inf
+
+        available = int(np.isfinite(scores).sum())
+        limit = min(limit, available)
+        if limit <= 0:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(self.ids[i]), float(scores[i])) for i in top]
+
+
+class SharedSimilarityIndex:
+    """
+    Index of the web process: requests never build it, the version saved by the
+    workers is checked every CATALOG_SIMILARITY_REFRESH_INTERVAL seconds and loaded when new
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = None
+        self.checked_at = None
+
+    def get(self):
+        with self.lock:
+            if self.checked_at is None or time.monotonic() - self.checked_at >= settings.CATALOG_SIMILARITY_REFRESH_INTERVAL:
+                self.checked_at = time.monotonic()
+                version = cache.get(SIMILARITY_INDEX_VERSION_KEY)
+                if version is not None and (self.index is None or version != self.index.version):
+                    self.index = TrackSimilarityIndex.load() or self.index
+            return self.index
+
+
+similarity_index = SharedSimilarityIndex()
+
+
+def get_similar_tracks(track_id, limit=10, candidate_ids=None):
+    """
+    See TrackSimilarityIndex.similar, None while the index is not built yet
+    """
+    index = similarity_index.get()
+    if index is None:
+        return None
+    return index.similar(track_id, limit, candidate_ids)
@@ -0,0 +1,42 @@
+from django.db.models import Exists, OuterRef
+from django.utils.text import slugify
+from taggit.models import TaggedItem
+
+
+# namespaced track tags, e.g. "mood:Chill", filterable with ?mood=Chill
+TAG_NAMESPACES = ['mood', 'culture', 'style', 'instrument', 'category']
+TAG_NAMESPACE_SEPARATOR = ':'
+
+
+def make_tag_name(namespace, value):
+    return f'{namespace}{TAG_NAMESPACE_SEPARATOR}{value}'
+
+
+def split_tag_name(name):
+    """
+    (namespace, value) of a tag name, namespace is None for plain tags
+    """
+    namespace, separator, value = name.partition(TAG_NAMESPACE_SEPARATOR)
+    if separator and namespace in TAG_NAMESPACES:
+        return namespace, value
+    return None, name
+
+
+def get_tag_slug(name):
+    """
+    Slug of a tag name, "mood:Chill" -> "mood-chill"
+    """
+    return slugify(name.replace(TAG_NAMESPACE_SEPARATOR, ' '), allow_unicode=True)
+
+
+def track_has_tags(**tag_lookups):
+    """
+    Exists() condition for tracks tagged with any of the matching tags, e.g.
+    track_has_tags(tag__name__in=names): a semi-join, no duplicated rows
+    """
+    return Exists(TaggedItem.objects.filter(
+        content_type__app_label='catalog',
+        content_type__model='track',
+        object_id=OuterRef('pk'),
+        **tag_lookups
+    ))
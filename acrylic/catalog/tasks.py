@@ -0,0 +1,220 @@
+import logging
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from acrylic.celery import app
+from catalog.search import update_search_vectors
+from catalog.similarity import TrackSimilarityIndex
+from chartmetric.engine import Chartmetric
+from chartmetric.tasks import set_chartmetric_id
+from spotify.engine import spotify_client
+from spotify.tasks import needs_spotify_track_data, set_spotify_id, set_spotify_track_data
+
+
+logger = logging.getLogger(__name__)
+
+# max ids of a Spotify "several tracks" request
+SPOTIFY_TRACKS_BATCH = 50
+
+ENRICHMENT_LOCK_KEY = 'catalog:track-enrichment:lock'
+ENRICHMENT_PENDING_KEY = 'catalog:track-enrichment:pending'
+# a drain of thousands of tracks is long, Chartmetric allows ~1 request per second
+ENRICHMENT_LOCK_TIMEOUT = 60 * 60
+
+SIMILARITY_LOCK_KEY = 'catalog:similarity-index:lock'
+SIMILARITY_QUEUED_KEY = 'catalog:similarity-index:queued'
+# a full build reads every track and its genres and tags
+SIMILARITY_LOCK_TIMEOUT = 30 * 60
+
+# loaded by the enrichment when blank, and only written where they are still blank
+ENRICHED_FIELDS = ['spotify_id', 'chartmetric_id', 'name', 'cover_image', 'snippet']
+ENRICHMENT_STATUS_FIELDS = ['enrichment_pending', 'enrichment_attempts', 'updated']
+
+
+class EnrichmentClients:
+    """
+    Spotify and Chartmetric clients created on first use and shared by every batch of a drain
+    """
+
+    def __init__(self):
+        self._spotify = None
+        self._chartmetric = None
+
+    @property
+    def spotify(self):
+        if self._spotify is None:
+            self._spotify = spotify_client()
+        return self._spotify
+
+    @property
+    def chartmetric(self):
+        if self._chartmetric is None:
+            cm = Chartmetric()
+            cm.authenticate()
+            self._chartmetric = cm
+        return self._chartmetric
+
+
+def schedule_track_enrichment(count=1):
+    """
+    Counts new pending tracks once the transaction commits, and starts a drain when
+    TRACK_ENRICHMENT_BATCH_SIZE of them are waiting. The periodic drain picks up the rest.
+    """
+    def count_pending():
+        cache.add(ENRICHMENT_PENDING_KEY, 0, None)
+        if cache.incr(ENRICHMENT_PENDING_KEY, count) >= settings.TRACK_ENRICHMENT_BATCH_SIZE:
+            cache.set(ENRICHMENT_PENDING_KEY, 0, None)
+            drain_track_enrichment.delay()
+
+    transaction.on_commit(count_pending)
+
+
+def get_enriched_values(track):
+    """
+    {field: value} of the ENRICHED_FIELDS, files by name
+    """
+    return {field: str(getattr(track, field)) for field in ENRICHED_FIELDS}
+
+
+def enrich_tracks(tracks, clients):
+    """
+    Loads the Spotify ids and data and the Chartmetric ids of the tracks, grouping the
+    Spotify track data requests. Only the fields each track got are written, and only
+    where they are still blank: edits made by the artist during the drain are kept.
+    Tracks that fail stay pending and are retried by the next drains, until they
+    failed TRACK_ENRICHMENT_MAX_ATTEMPTS times.
+    """
+    Track = apps.get_model('catalog', 'Track')
+    Artist = apps.get_model('artist', 'Artist')
+
+    # tracks of the same artist share the instance, so the artist ids are only set once
+    artists = Artist.objects.in_bulk({track.artist_id for track in tracks})
+    for track in tracks:
+        track.artist = artists[track.artist_id]
+
+    loaded = {track.id: get_enriched_values(track) for track in tracks}
+    failed = set()
+    for track in tracks:
+        if track.spotify_id == '':
+            try:
+                set_spotify_id(track, clients.spotify)
+            except Exception:
+                logger.exception('Spotify ID lookup failed for track %s', track.id)
+                failed.add(track.id)
+
+    with_data = [track for track in tracks if track.spotify_id and needs_spotify_track_data(track)]
+    for i in range(0, len(with_data), SPOTIFY_TRACKS_BATCH):
+        batch = with_data[i:i + SPOTIFY_TRACKS_BATCH]
+        try:
+            results = clients.spotify.tracks([track.spotify_id for track in batch])['tracks']
+        except Exception:
+            logger.exception('Spotify tracks request failed')
+            failed.update(track.id for track in batch)
+            continue
+        for track, track_info in zip(batch, results):
+            if track_info:
+                try:
+                    set_spotify_track_data(track, track_info)
+                except Exception:
+                    # files saved before the error are kept by the bulk_update below
+                    logger.exception('Spotify data download failed for track %s', track.id)
+                    failed.add(track.id)
+
+    for track in tracks:
+        if track.chartmetric_id == '':
+            try:
+                set_chartmetric_id(track, clients.chartmetric)
+            except Exception:
+                logger.exception('Chartmetric ID lookup failed for track %s', track.id)
+                failed.add(track.id)
+
+    renamed = []
+    for track in tracks:
+        changed = {field: value for field, value in get_enriched_values(track).items() if value != loaded[track.id][field]}
+        if not changed:
+            continue
+        # one UPDATE per enriched track, each field only set if still blank
+        Track.objects.filter(id=track.id).update(**{
+            field: Case(When(**{field: ''}, then=Value(value)), default=F(field), output_field=Track._meta.get_field(field))
+            for field, value in changed.items()
+        })
+        if 'name' in changed:
+            renamed.append(track.id)
+
+    # bulk_update does not set auto_now fields
+    now = timezone.now()
+    for track in tracks:
+        if track.id in failed:
+            # retried by the next drains, up to TRACK_ENRICHMENT_MAX_ATTEMPTS
+            track.enrichment_attempts += 1
+            track.enrichment_pending = track.enrichment_attempts < settings.TRACK_ENRICHMENT_MAX_ATTEMPTS
+        else:
+            track.enrichment_pending = False
+        track.updated = now
+    Track.objects.bulk_update(tracks, ENRICHMENT_STATUS_FIELDS, batch_size=500)
+    if renamed:
+        # names loaded from Spotify are searchable
+        update_search_vectors(Track.objects.filter(id__in=renamed))
+
+
+@app.task
+def drain_track_enrichment():
+    """
+    Enriches the pending tracks in batches of TRACK_ENRICHMENT_BATCH_SIZE with one
+    authenticated client per API. Runs periodically (see acrylic.celery) and when enough
+    tracks are pending, a cache lock keeps a single drain running at a time.
+    """
+    Track = apps.get_model('catalog', 'Track')
+
+    if not cache.add(ENRICHMENT_LOCK_KEY, 1, ENRICHMENT_LOCK_TIMEOUT):
+        return 0
+    try:
+        cache.set(ENRICHMENT_PENDING_KEY, 0, None)
+        clients = EnrichmentClients()
+        enriched = 0
+        last_id = 0
+        while True:
+            # keyset over the pending rows, so failed tracks are only visited once per drain
+            tracks = list(
+                Track.objects.filter(enrichment_pending=True, id__gt=last_id).order_by('id').only(
+                    'id', 'isrc', 'name', 'artist_id', 'spotify_id', 'chartmetric_id', 'cover_image', 'snippet',
+                    'enrichment_attempts',
+                )[:settings.TRACK_ENRICHMENT_BATCH_SIZE]
+            )
+            if not tracks:
+                break
+            enrich_tracks(tracks, clients)
+            enriched += len(tracks)
+            last_id = tracks[-1].id
+        return enriched
+    finally:
+        cache.delete(ENRICHMENT_LOCK_KEY)
+
+
+@app.task
+def refresh_similarity_index():
+    """
+    Builds the similar tracks index, or re-encodes the tracks updated since the saved one,
+    and shares it with the web processes through the cache (see catalog.similarity)
+    """
+    if not cache.add(SIMILARITY_LOCK_KEY, 1, SIMILARITY_LOCK_TIMEOUT):
+        return False
+    try:
+        index = TrackSimilarityIndex.load() or TrackSimilarityIndex()
+        changed = index.refresh()
+        if changed:
+            index.save()
+        return changed
+    finally:
+        cache.delete(SIMILARITY_LOCK_KEY)
+
+
+def schedule_similarity_index():
+    """
+    Queues a build when the index is missing, at most once per CATALOG_SIMILARITY_REFRESH_INTERVAL
+    """
+    if cache.add(SIMILARITY_QUEUED_KEY, 1, settings.CATALOG_SIMILARITY_REFRESH_INTERVAL):
+        refresh_similarity_index.delay()
@@ -1,3 +1,502 @@
+import csv
+import json
+import os
+import tempfile
+from base64 import urlsafe_b64decode
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from taggit.models import Tag
+from rest_framework.test import APIRequestFactory, APITestCase
+from artist.models import Artist
+from catalog.bulk import create_tracks
+from catalog.imports import ImportCheckpoint, TrackImporter
+from catalog.models import Genre, SyncList, SyncListTrack, Track
+from catalog.playlists import PlaylistSync
+from catalog.pricing import get_request_price_matrix, get_track_price
+from catalog.similarity import similarity_index
+from catalog.tasks import enrich_tracks, refresh_similarity_index
+from spotify.models import SpotifyPlaylist, SpotifyPlaylistTrack
 
-# Create your tests here.
+
+def create_artist(name='Artist', **kwargs):
+    # bulk_create skips artist_created, which loads the Spotify profile and requests the contract
+    return Artist.objects.bulk_create([Artist(name=name, **kwargs)])[0]
+
+
+def get_cursor(url):
+    """
+    Decoded cursor param of a next / previous link
+    """
+    encoded = parse_qs(urlparse(url).query)['cursor'][0]
+    return json.loads(urlsafe_b64decode(encoded.encode()).decode())
+
+
+class KeysetPaginationTests(APITestCase):
+    url = '/api/v1/tracks/'
+
+    @classmethod
+    def setUpTestData(cls):
+        artist = create_artist()
+        # sort keys repeated across page boundaries: the id breaks the ties
+        create_tracks(artist, [
+            {'isrc': f'USAC1240000{i}', 'name': 'Alpha song' if i < 5 else 'Beta song'} for i in range(7)
+        ])
+
+    def get_pages(self, params):
+        """
+        Follows the next links from the first page, returns [(ids, response data)]
+        """
+        response = self.client.get(self.url, dict(params, cursor='', page_size=2))
+        pages = []
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append(([track['uuid'] for track in response.data['results']], response.data))
+            if not response.data['next']:
+                return pages
+            response = self.client.get(response.data['next'])
+
+    def assert_pages(self, params, expected):
+        pages = self.get_pages(params)
+        self.assertEqual([uuid for ids, _ in pages for uuid in ids], [str(track.uuid) for track in expected])
+        self.assertIsNone(pages[0][1]['previous'])
+        self.assertNotIn('count', pages[0][1])
+
+        # back from each page lands on the page before it
+        for (previous_ids, _), (_, data) in zip(pages, pages[1:]):
+            response = self.client.get(data['previous'])
+            self.assertEqual([track['uuid'] for track in response.data['results']], previous_ids)
+        return pages
+
+    def test_duplicate_keys(self):
+        pages = self.assert_pages({'ordering': 'name'}, Track.objects.order_by('name', 'id'))
+        self.assertEqual(len(pages), 4)
+
+    def test_duplicate_keys_descending(self):
+        self.assert_pages({'ordering': '-name'}, Track.objects.order_by('-name', '-id'))
+
+    def test_cursor_encoding(self):
+        (ids, data), (next_ids, next_data) = self.get_pages({'ordering': 'name'})[:2]
+        last = Track.objects.get(uuid=ids[-1])
+        self.assertEqual(get_cursor(data['next']), {'v': 'Alpha song', 'k': last.pk, 'r': 0})
+        first = Track.objects.get(uuid=next_ids[0])
+        self.assertEqual(get_cursor(next_data['previous']), {'v': 'Alpha song', 'k': first.pk, 'r': 1})
+
+    def test_search_rank_keys(self):
+        """
+        Equal ranks on every track: the rank is cast to a float so it survives the JSON cursor
+        """
+        pages = self.assert_pages({'search': 'song'}, Track.objects.order_by('-id'))
+        self.assertIsInstance(get_cursor(pages[0][1]['next'])['v'], float)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_number_without_cursor(self):
+        response = self.client.get(self.url, {'page_size': 2})
+        self.assertEqual(response.data['count'], 7)
+
+
+class SyncListTracksTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username='synclist@acrylic.la', email='synclist@acrylic.la')
+        cls.artist = create_artist(user=cls.user)
+        cls.tracks = create_tracks(cls.artist, [{'isrc': f'USAC1240010{i}', 'name': f'Track {i}'} for i in range(4)])
+        cls.synclist = SyncList.objects.create(artist=cls.artist, name='Synclist')
+        for order, track in enumerate(cls.tracks):
+            SyncListTrack.objects.create(synclist=cls.synclist, track=track, order=order)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def get_url(self, action):
+        return f'/api/v1/my-artist/synclists/{self.synclist.uuid}/{action}/'
+
+    def get_track_uuids(self):
+        return [
+            str(track_uuid) for track_uuid in
+            SyncListTrack.objects.filter(synclist=self.synclist).order_by('order', 'id').values_list('track__uuid', flat=True)
+        ]
+
+    def reorder(self, track_uuids):
+        return self.client.post(self.get_url('reorder'), {'tracks': track_uuids}, format='json')
+
+    def test_reorder(self):
+        updated = SyncList.objects.get(pk=self.synclist.pk).updated
+        track_uuids = [str(self.tracks[i].uuid) for i in [1, 0, 2, 3]]
+        response = self.reorder(track_uuids)
+        self.assertEqual(response.status_code, 200)
+        # only the swapped rows are written
+        self.assertEqual(response.data, {'updated': 2})
+        self.assertEqual(self.get_track_uuids(), track_uuids)
+        self.assertGreater(SyncList.objects.get(pk=self.synclist.pk).updated, updated)
+
+    def test_reorder_unchanged(self):
+        response = self.reorder(self.get_track_uuids())
+        self.assertEqual(response.data, {'updated': 0})
+
+    def test_reorder_validation(self):
+        track_uuids = self.get_track_uuids()
+        for invalid in [
+            track_uuids[:-1],  # missing track
+            track_uuids + [str(self.tracks[0].uuid)],  # repeated track
+            track_uuids[:-1] + [str(Track().uuid)],  # not in the synclist
+            track_uuids[:-1] + ['invalid'],
+            [],
+        ]:
+            response = self.reorder(invalid)
+            self.assertEqual(response.status_code, 400, invalid)
+            self.assertIn('tracks', response.data)
+        self.assertEqual(self.get_track_uuids(), track_uuids)
+
+    def test_reorder_other_artist(self):
+        other = SyncList.objects.create(artist=create_artist('Other'), name='Other')
+        response = self.client.post(f'/api/v1/my-artist/synclists/{other.uuid}/reorder/', {'tracks': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(f'/api/v1/my-artist/synclists/{other.uuid}/reorder/', {'tracks': self.get_track_uuids()}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_remove_tracks(self):
+        updated = SyncList.objects.get(pk=self.synclist.pk).updated
+        response = self.client.post(
+            self.get_url('remove-tracks'), {'tracks': [{'track_uuid': str(track.uuid)} for track in self.tracks[:2]]}, format='json'
+        )
+        self.assertEqual(response.status_code, 204)
+        synclist = SyncList.objects.get(pk=self.synclist.pk)
+        self.assertEqual(synclist.track_count, 2)
+        self.assertGreater(synclist.updated, updated)
+
+    def test_delete_membership(self):
+        """
+        Rows deleted one by one (admin inline, shell) update the synclist as well
+        """
+        updated = SyncList.objects.get(pk=self.synclist.pk).updated
+        SyncListTrack.objects.filter(synclist=self.synclist).first().delete()
+        synclist = SyncList.objects.get(pk=self.synclist.pk)
+        self.assertEqual(synclist.track_count, 3)
+        self.assertGreater(synclist.updated, updated)
+
+
+class LoadTracksResumeTests(TestCase):
+    columns = [
+        'Submitted on', 'ARTIST NAME', 'SONG NAME', 'SONG ISRC CODE', 'MAIN ARTIST HOMETOWN', 'GENRE 1', 'GENRE 2', 'GENRE 3',
+        'IS IT A COVER OF SOMEONE ELSE\'S SONG?', 'IS IT A REMIX?', 'EXPLICIT LYRICS?', 'SONG LENGTH', 'BPM', 'LANGUAGE(S)',
+        'LYRICS', 'IS IT AN INSTRUMENTAL?', 'YOUR SPOTIFY ARTIST PROFILE URL',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        # an existing artist: new ones are created with their Spotify and HubSpot side effects
+        create_artist('Palmasur')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'tracks.csv')
+        self.write_csv(5)
+
+    def write_csv(self, count):
+        with open(self.path, 'w', encoding='utf-8', newline='') as csv_file:
+            writer = csv.DictWriter(csv_file, self.columns, restval='')
+            writer.writeheader()
+            for i in range(count):
+                writer.writerow({
+                    'Submitted on': '2023/09/15', 'ARTIST NAME': 'Palmasur', 'SONG NAME': f'Song {i}',
+                    'SONG ISRC CODE': f'QZFYZ196220{i}', 'SONG LENGTH': '3:37', 'BPM': '100', 'LANGUAGE(S)': 'Spanish',
+                })
+
+    def load_tracks(self, **options):
+        stdout = StringIO()
+        call_command('load_tracks', self.path, chunk_size=2, no_split_sheets=True, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def interrupt_after(self, chunks):
+        """
+        load_tracks failing on the chunk after the given number of chunks
+        """
+        import_rows = TrackImporter.import_rows
+        calls = []
+
+        def failing_import_rows(importer, rows):
+            calls.append(rows)
+            if len(calls) > chunks:
+                raise RuntimeError('interrupted')
+            return import_rows(importer, rows)
+
+        with mock.patch.object(TrackImporter, 'import_rows', failing_import_rows):
+            with self.assertRaises(RuntimeError):
+                self.load_tracks()
+
+    def test_resume(self):
+        self.interrupt_after(2)
+        self.assertEqual(Track.objects.count(), 4)
+        self.assertEqual(ImportCheckpoint(self.path).load(), 4)
+
+        output = self.load_tracks(resume=True)
+        self.assertIn('Resuming after row 4', output)
+        self.assertIn('Imported 1 rows', output)
+        self.assertEqual(
+            sorted(Track.objects.values_list('isrc', flat=True)), [f'QZFYZ196220{i}' for i in range(5)]
+        )
+        # a complete import leaves no checkpoint
+        self.assertFalse(os.path.exists(f'{self.path}.checkpoint'))
+
+    def test_resume_changed_file(self):
+        """
+        The checkpoint of another version of the file is ignored: the rows are read from the start
+        """
+        self.interrupt_after(1)
+        self.write_csv(6)
+        self.assertEqual(ImportCheckpoint(self.path).load(), 0)
+
+        output = self.load_tracks(resume=True)
+        self.assertNotIn('Resuming', output)
+        self.assertEqual(Track.objects.count(), 6)
+
+    def test_without_resume(self):
+        self.interrupt_after(1)
+        # from the start, the rows already committed are skipped
+        output = self.load_tracks()
+        self.assertIn('3 tracks created, 0 updated, 2 skipped', output)
+        self.assertEqual(Track.objects.count(), 5)
+
+
+class FakeSpotify:
+    """
+    Spotify client serving a playlist from memory, items in pages of 2
+    """
+
+    def __init__(self, snapshot_id, track_ids):
+        self.snapshot_id = snapshot_id
+        self.track_ids = track_ids
+        self.requested_tracks = []
+        self.requests = 0
+
+    def get_track(self, spotify_id):
+        return {
+            'id': spotify_id,
+            'type': 'track',
+            'is_local': False,
+            'name': f'Track {spotify_id}',
+            'external_ids': {'isrc': f'USSP1240{spotify_id}'},
+            'duration_ms': 200000,
+            'popularity': 50,
+            'album': {'release_date': '2021-05'},
+            'artists': [{'id': f'artist{spotify_id}', 'name': f'Artist {spotify_id}', 'external_urls': {}}],
+        }
+
+    def playlist(self, playlist_id, fields=None):
+        self.requests += 1
+        return {'name': 'Playlist', 'snapshot_id': self.snapshot_id}
+
+    def playlist_items(self, playlist_id, fields=None, additional_types=None):
+        return self.next({'next': 0})
+
+    def next(self, results):
+        self.requests += 1
+        start = results['next']
+        items = [
+            # None: a local file
+            {'added_at': '2024-01-01T00:00:00Z', 'track': {'id': spotify_id, 'type': 'track'} if spotify_id else {'is_local': True}}
+            for spotify_id in self.track_ids[start:start + 2]
+        ]
+        return {'items': items, 'next': start + 2 if start + 2 < len(self.track_ids) else None}
+
+    def tracks(self, spotify_ids):
+        self.requests += 1
+        self.requested_tracks.extend(spotify_ids)
+        return {'tracks': [self.get_track(spotify_id) for spotify_id in spotify_ids]}
+
+
+class PlaylistSyncTests(TestCase):
+
+    def setUp(self):
+        self.playlist = SpotifyPlaylist.objects.create(spotify_id='playlist')
+
+    def sync(self, snapshot_id, track_ids, force=False):
+        self.spotify = FakeSpotify(snapshot_id, track_ids)
+        self.playlist_sync = PlaylistSync(self.spotify)
+        return self.playlist_sync.sync(self.playlist, force=force)
+
+    def get_positions(self):
+        return dict(
+            SpotifyPlaylistTrack.objects.filter(playlist=self.playlist).values_list('track__spotify_id', 'position')
+        )
+
+    def test_import(self):
+        self.assertTrue(self.sync('s1', ['a', 'b', 'a', None, 'c']))
+        # a repeated track keeps its first position
+        self.assertEqual(self.get_positions(), {'a': 0, 'b': 1, 'c': 4})
+        self.assertEqual(sorted(self.spotify.requested_tracks), ['a', 'b', 'c'])
+        self.assertEqual(self.playlist_sync.stats['added'], 3)
+
+        playlist = SpotifyPlaylist.objects.get(pk=self.playlist.pk)
+        self.assertEqual((playlist.name, playlist.snapshot_id), ('Playlist', 's1'))
+        self.assertIsNotNone(playlist.synced)
+        track = Track.objects.select_related('artist').get(spotify_id='a')
+        self.assertEqual((track.isrc, track.artist.spotify_id), ('USSP1240a', 'artista'))
+
+    def test_unchanged_snapshot(self):
+        self.sync('s1', ['a', 'b'])
+        self.assertFalse(self.sync('s1', ['b', 'c']))
+        # a single request, nothing written
+        self.assertEqual(self.spotify.requests, 1)
+        self.assertEqual(self.playlist_sync.stats['playlists_unchanged'], 1)
+        self.assertEqual(self.get_positions(), {'a': 0, 'b': 1})
+
+        self.assertTrue(self.sync('s1', ['b', 'c'], force=True))
+        self.assertEqual(self.get_positions(), {'b': 0, 'c': 1})
+
+    def test_diff(self):
+        self.sync('s1', ['a', 'b', 'c', 'd'])
+        self.assertTrue(self.sync('s2', ['c', 'a', 'd', 'e', 'c']))
+
+        self.assertEqual(self.get_positions(), {'c': 0, 'a': 1, 'd': 2, 'e': 3})
+        # only the added tracks are requested
+        self.assertEqual(self.spotify.requested_tracks, ['e'])
+        stats = self.playlist_sync.stats
+        self.assertEqual((stats['added'], stats['removed'], stats['moved']), (1, 1, 3))
+        # removed from the playlist, not from the catalog
+        self.assertTrue(Track.objects.filter(spotify_id='b').exists())
+        self.assertEqual(SpotifyPlaylist.objects.get(pk=self.playlist.pk).snapshot_id, 's2')
+
+
+class EnrichTracksTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.blank, cls.named = create_tracks(create_artist(spotify_id='artist', chartmetric_id='1'), [
+            {'isrc': 'USAC12400200', 'name': ''},
+            {'isrc': 'USAC12400201', 'name': 'Named'},
+        ])
+
+    def set_spotify_id(self, track, spotify):
+        track.spotify_id = f'spotify{track.id}'
+        # edits by the artist while the drain runs
+        Track.objects.filter(id=self.blank.id).update(name='Edited')
+        Track.objects.filter(id=self.named.id).update(name='Renamed')
+
+    def set_chartmetric_id(self, track, cm):
+        track.chartmetric_id = f'{track.id}'
+
+    def test_keeps_edits(self):
+        clients = mock.Mock()
+        clients.spotify.tracks.side_effect = lambda ids: {'tracks': [{'name': f'Spotify {id}'} for id in ids]}
+        tracks = list(Track.objects.filter(id__in=[self.blank.id, self.named.id]).order_by('id'))
+        with mock.patch('catalog.tasks.set_spotify_id', self.set_spotify_id), \
+                mock.patch('catalog.tasks.set_chartmetric_id', self.set_chartmetric_id), \
+                mock.patch('catalog.tasks.set_spotify_track_data', lambda track, info: setattr(track, 'name', track.name or info['name'])):
+            enrich_tracks(tracks, clients)
+
+        blank, named = Track.objects.filter(id__in=[self.blank.id, self.named.id]).order_by('id')
+        self.assertEqual((blank.name, blank.spotify_id, blank.chartmetric_id), ('Edited', f'spotify{blank.id}', str(blank.id)))
+        self.assertEqual((named.name, named.spotify_id), ('Renamed', f'spotify{named.id}'))
+        self.assertFalse(blank.enrichment_pending or named.enrichment_pending)
+
+
+class SimilarTracksTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        rock, pop = Genre.objects.bulk_create([Genre(name='Rock', code='rock'), Genre(name='Pop', code='pop')])
+        cls.track, cls.close, cls.far = create_tracks(create_artist(), [
+            {'isrc': 'USAC12400300', 'name': 'Track', 'genres': [rock.id], 'tags': ['mood:chill'], 'bpm': 100},
+            {'isrc': 'USAC12400301', 'name': 'Close', 'genres': [rock.id], 'tags': ['mood:chill'], 'bpm': 104},
+            {'isrc': 'USAC12400302', 'name': 'Far', 'genres': [pop.id], 'bpm': 160, 'is_explicit': True},
+        ])
+
+    def setUp(self):
+        cache.clear()
+        similarity_index.index = similarity_index.checked_at = None
+        self.url = f'/api/v1/tracks/{self.track.uuid}/similar/'
+
+    def test_built_by_workers(self):
+        with mock.patch('catalog.views.schedule_similarity_index') as schedule_similarity_index:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 503)
+        schedule_similarity_index.assert_called_once()
+
+        self.assertTrue(refresh_similarity_index())
+        similarity_index.checked_at = None
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([track['uuid'] for track in response.data], [str(self.close.uuid), str(self.far.uuid)])
+        self.assertGreater(response.data[0]['similarity'], response.data[1]['similarity'])
+
+    def test_refresh(self):
+        refresh_similarity_index()
+        # nothing changed: the saved index is kept
+        self.assertFalse(refresh_similarity_index())
+
+        # now the same features as the track
+        far = Track.objects.get(pk=self.far.pk)
+        far.genres.set([self.track.genres.get()])
+        far.tags.add('mood:chill')
+        far.bpm, far.is_explicit = 100, False
+        far.save()
+        self.assertTrue(refresh_similarity_index())
+        similarity_index.checked_at = None
+        response = self.client.get(self.url, {'limit': 1})
+        self.assertEqual([track['uuid'] for track in response.data], [str(self.far.uuid)])
+
+
+class SearchVectorSignalsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.genre = Genre.objects.create(name='Rock', code='rock')
+        cls.track = create_tracks(create_artist(), [
+            {'isrc': 'USAC12400400', 'name': 'Track', 'genres': [cls.genre.id], 'tags': ['mood:chill']}
+        ])[0]
+        cls.tag = Tag.objects.get(name='mood:chill')
+
+    def assert_vectors_updated(self, instance, updated, **values):
+        for field, value in values.items():
+            setattr(instance, field, value)
+        with mock.patch('catalog.signals.update_search_vectors') as update_search_vectors:
+            instance.save()
+        self.assertEqual(update_search_vectors.called, updated, instance)
+
+    def test_unchanged_saves(self):
+        track = Track.objects.get(pk=self.track.pk)
+        for instance in [track, track.artist, Genre.objects.get(pk=self.genre.pk), Tag.objects.get(pk=self.tag.pk)]:
+            self.assert_vectors_updated(instance, False)
+        self.assert_vectors_updated(track, False, bpm=120)
+
+    def test_renames(self):
+        track = Track.objects.get(pk=self.track.pk)
+        self.assert_vectors_updated(track, True, name='Renamed')
+        self.assert_vectors_updated(track, True, artist=create_artist('Other'))
+        self.assert_vectors_updated(track.artist, True, name='Renamed')
+        self.assert_vectors_updated(Genre.objects.get(pk=self.genre.pk), True, name='Hard rock')
+        self.assert_vectors_updated(Tag.objects.get(pk=self.tag.pk), True, name='mood:calm')
+
+    def test_search(self):
+        tag = Tag.objects.get(pk=self.tag.pk)
+        tag.name = 'mood:calm'
+        tag.save()
+        response = self.client.get('/api/v1/tracks/', {'search': 'calm'})
+        self.assertEqual([track['uuid'] for track in response.data['results']], [str(self.track.uuid)])
+
+
+class PriceMatrixTests(TestCase):
+    matrix = {'default': 1, 'prices': {1: {1: {'single_use': 10, 'subscription': 5}}, 2: {1: {'single_use': 20, 'subscription': 8}}}}
+
+    def test_read_once_per_request(self):
+        request = APIRequestFactory().get('/')
+        with mock.patch('catalog.pricing.get_price_matrix', return_value=self.matrix) as get_price_matrix, \
+                mock.patch('catalog.pricing.cache') as price_cache:
+            amounts = [
+                get_track_price(Track(price_id=price_id), 1, 'single_use', get_request_price_matrix(request))
+                for price_id in [None, 2, 1, 2]
+            ]
+        self.assertEqual(amounts, [10, 20, 10, 20])
+        get_price_matrix.assert_called_once()
+        self.assertFalse(price_cache.method_calls)
@@ -1,32 +1,68 @@
-from django.db.models import Prefetch
-from django.shortcuts import get_object_or_404
-from django_filters import rest_framework as rest_filters
+from collections import Counter
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import F, Prefetch
+from django_filters import rest_framework as rest_filters, utils as filter_utils
 from rest_framework import viewsets, filters, permissions, status, serializers
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample, inline_serializer
 from taggit.models import Tag
-from common.api.pagination import StandardPagination
+from common.api.pagination import StandardPagination, ListingPagination
+from common.api.serializers import SPARSE_PARAMETERS, get_sparse_lookups
+from common.api.viewsets import ConditionalGetMixin, SparseFieldsetMixin
+from common.cache import ReadOnlyResponseCacheMixin
+from catalog.search import TrackSearchFilter
+from catalog.bulk import MAX_BULK_TRACKS, create_tracks
+from catalog.counters import update_synclist_counts
+from catalog.facets import get_cached_track_facets
+from catalog.pricing import get_request_price_matrix, quote_tracks
+from catalog.similarity import get_similar_tracks
+from catalog.tasks import schedule_similarity_index
+from catalog.tags import TAG_NAMESPACES, TAG_NAMESPACE_SEPARATOR, make_tag_name, track_has_tags
+from artist.models import Artist
 from artist.permissions import IsArtistOwner, IsTrackArtistOwner
-from catalog.models import Distributor, Track, Genre, Price, SyncList, SyncListTrack
+from buyer.models import Tier
+from buyer.permissions import IsBuyer
+from catalog.models import Distributor, Track, Genre, Price, TierPrice, SyncList, SyncListTrack
 from catalog.serializers import (
     DistributorSerializer, TrackSerializer, MyTrackSerializer, MyTrackReadSerializer, 
-    GenreSerializer, SyncListSerializer, SyncListTrackSerializer, PriceSerializer, MyPriceSerializer
+    GenreListSerializer, SyncListSerializer, SyncListTrackSerializer, PriceSerializer, MyPriceSerializer,
+    QuoteRequestSerializer, QuoteSerializer, SyncListTrackItemSerializer, TrackTagSerializer,
+    MyTrackBulkItemSerializer
 )
 
 
+class CharInFilter(rest_filters.BaseInFilter, rest_filters.CharFilter):
+    pass
+
+
 class TrackFilter(rest_filters.FilterSet):
     is_cover = rest_filters.BooleanFilter()
     is_remix = rest_filters.BooleanFilter()
     is_instrumental = rest_filters.BooleanFilter()
     is_explicit = rest_filters.BooleanFilter()
     released = rest_filters.DateFilter()
-    genres = rest_filters.ModelMultipleChoiceFilter(queryset=Genre.objects.all(), to_field_name='code', field_name='genres')
+    genres = rest_filters.ModelMultipleChoiceFilter(queryset=Genre.objects.all(), to_field_name='code', field_name='genres__code')
     tags = rest_filters.ModelMultipleChoiceFilter(queryset=Tag.objects.all(), to_field_name='name', method='tags_filter')
+    # namespaced tags, comma separated values match any of them, e.g. ?mood=Chill,Happy&instrument=Piano
+    mood = CharInFilter(method='tag_namespace_filter')
+    culture = CharInFilter(method='tag_namespace_filter')
+    style = CharInFilter(method='tag_namespace_filter')
+    instrument = CharInFilter(method='tag_namespace_filter')
+    category = CharInFilter(method='tag_namespace_filter')
 
     def tags_filter(self, queryset, name, value):
         if value:
-            return queryset.filter(tags__in=value) 
+            return queryset.filter(track_has_tags(tag__in=value))
+        return queryset
+
+    def tag_namespace_filter(self, queryset, name, value):
+        if value:
+            return queryset.filter(track_has_tags(tag__name__in=[make_tag_name(name, item) for item in value]))
         return queryset
 
     class Meta:
@@ -37,25 +73,95 @@ class TrackFilter(rest_filters.FilterSet):
     #    return queryset.filter(tags__name__in=[tag.name for tag in value])
 
 
+MAX_SIMILAR_TRACKS = 50
+
+
 @extend_schema(
     parameters=[
         # Documenting search fields
-        OpenApiParameter(name='search', description='Search tracks by UUID, ISRC, name, or artist name', required=False, type=str),
+        OpenApiParameter(name='search', description='Full-text search tracks by name, artist name, tags, genres or lyrics. Exact match by UUID or ISRC', required=False, type=str),
         # Documenting ordering fields
         OpenApiParameter(name='ordering', description='Order by name, created, or updated', required=False, type=str),
-    ],
+    ] + SPARSE_PARAMETERS,
 )
-class TrackViewSet(viewsets.ReadOnlyModelViewSet):
+class TrackViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = []
     authentication_classes = []
-    queryset = Track.objects.select_related('artist').prefetch_related('genres', 'tags', 'additional_main_artists', 'featured_artists')  # Adjusted from Track.active.all() to simplify the example
+    queryset = Track.objects.select_related('artist', 'distributor', 'price').prefetch_related('genres', 'tags', 'additional_main_artists', 'featured_artists').defer('search_vector')  # Adjusted from Track.active.all() to simplify the example
     lookup_field = 'uuid'
+    # the payload embeds the artist, distributor and price (?expand=)
+    conditional_fields = ['updated', 'artist__updated', 'distributor__updated', 'price__updated']
     serializer_class = TrackSerializer
-    pagination_class = StandardPagination
-    filter_backends = [rest_filters.DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = ListingPagination
+    filter_backends = [rest_filters.DjangoFilterBackend, TrackSearchFilter, filters.OrderingFilter]
     filterset_class = TrackFilter
-    search_fields = ['=uuid', '=isrc', 'name', 'artist__name']
     ordering_fields = ['name', 'created', 'updated']
+    sparse_select_related = {
+        'artist': ['artist'],
+        'distributor': ['distributor'],
+        'price': ['price'],
+    }
+    sparse_prefetch_related = {
+        'genres': ['genres'],
+        'tags': ['tags'],
+        'additional_main_artists': ['additional_main_artists'],
+        'featured_artists': ['featured_artists'],
+    }
+    sparse_expand_prefetch_related = {
+        'price': ['price__tier_prices__tier'],
+    }
+
+    @extend_schema(
+        responses={200: OpenApiTypes.OBJECT},
+        description="Track counts per genre, tag, flag, language and BPM bucket for the tracks matching the given filters.",
+    )
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(get_cached_track_facets(queryset, request.query_params))
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='limit', description=f'Number of tracks, max {MAX_SIMILAR_TRACKS}', required=False, type=int),
+        ],
+        responses={200: TrackSerializer(many=True), 503: OpenApiTypes.OBJECT},
+        description="Tracks most similar to this one by genres, tags, language, flags, BPM, duration and popularity, "
+                    "with a `similarity` score. Track filters restrict the results. 503 until the index is first built.",
+    )
+    @action(detail=True, methods=['get'])
+    def similar(self, request, uuid=None):
+        track = get_object_or_404(Track.objects.only('id'), uuid=uuid)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), MAX_SIMILAR_TRACKS)
+        except ValueError:
+            limit = 10
+
+        candidate_ids = None
+        filterset = self.filterset_class(request.query_params, queryset=Track.objects.all(), request=request)
+        if any(name in request.query_params for name in filterset.filters):
+            if not filterset.is_valid():
+                raise filter_utils.translate_validation(filterset.errors)
+            candidate_ids = filterset.qs.values_list('id', flat=True)
+
+        results = get_similar_tracks(track.id, limit, candidate_ids)
+        if results is None:
+            # built by the workers, not in the request
+            schedule_similarity_index()
+            return Response(
+                {'detail': 'Similar tracks are not available yet, try again later.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(settings.CATALOG_SIMILARITY_REFRESH_INTERVAL)}
+            )
+        tracks = self.get_queryset().in_bulk([track_id for track_id, _ in results])
+        data = []
+        for track_id, score in results:
+            if track_id not in tracks:
+                # deleted since the index was built
+                continue
+            item = self.get_serializer(tracks[track_id]).data
+            item['similarity'] = round(score, 4)
+            data.append(item)
+        return Response(data)
 
     
 class MyTrackViewSet(viewsets.ModelViewSet):
@@ -70,7 +176,10 @@ class MyTrackViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user_artist = self.request.user.artist
-        return Track.objects.filter(artist=user_artist).select_related('distributor', 'artist').prefetch_related('genres', 'tags', 'additional_main_artists', 'featured_artists')
+        tier_prices_prefetch = Prefetch('price__tier_prices', queryset=TierPrice.objects.select_related('tier'))
+        return Track.objects.filter(artist=user_artist).select_related('distributor', 'artist', 'price').prefetch_related(
+            'genres', 'tags', 'additional_main_artists', 'featured_artists', tier_prices_prefetch
+        ).defer('search_vector')
 
     def get_serializer_class(self):
         if self.action in ['list', 'retrieve']:
@@ -82,7 +191,118 @@ class MyTrackViewSet(viewsets.ModelViewSet):
         Automatically set the artist to the logged-in user's artist
         when creating a new track.
         """
-        serializer.save(artist=self.request.user.artist)
+        artist = self.request.user.artist
+        with transaction.atomic():
+            price = serializer.validated_data.get('price')
+            if price:
+                self.check_price_quota(artist, {price: 1})
+            serializer.save(artist=artist)
+
+    def perform_update(self, serializer):
+        artist = self.request.user.artist
+        with transaction.atomic():
+            price = serializer.validated_data.get('price')
+            if price and price != serializer.instance.price:
+                self.check_price_quota(artist, {price: 1})
+            serializer.save()
+
+    @extend_schema(
+        request=inline_serializer(
+            name='BulkTracksSerializer',
+            fields={'tracks': MyTrackBulkItemSerializer(many=True)}
+        ),
+        responses={201: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT},
+        description=f"Create up to {MAX_BULK_TRACKS} tracks of the artist at once. The whole batch is validated "
+                    "(ISRC format, ISRCs repeated in the payload or already in the catalog, price quota) and either "
+                    "every track is created or none, with the invalid items reported in `errors` by index.",
+    )
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        tracks_data = request.data.get('tracks', [])
+
+        if not isinstance(tracks_data, list) or not tracks_data:
+            return Response({"detail": "Tracks data must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(tracks_data) > MAX_BULK_TRACKS:
+            return Response({"detail": f"At most {MAX_BULK_TRACKS} tracks per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+        errors = []
+        items = []
+        for index, track_data in enumerate(tracks_data):
+            item_serializer = MyTrackBulkItemSerializer(data=track_data)
+            if not item_serializer.is_valid():
+                errors.append({'index': index, 'errors': item_serializer.errors})
+                continue
+            items.append((index, item_serializer.validated_data))
+
+        # one query per related model for the whole batch
+        isrc_counts = Counter(data['isrc'] for _, data in items)
+        existing_isrcs = set(Track.objects.filter(isrc__in=isrc_counts).values_list('isrc', flat=True))
+        prices = {price.uuid: price for price in Price.objects.filter(uuid__in={data['price'] for _, data in items})}
+        distributors = {
+            distributor.uuid: distributor for distributor in Distributor.objects.only('id', 'uuid').filter(
+                uuid__in={data['distributor'] for _, data in items if data.get('distributor')}
+            )
+        }
+        genres = dict(Genre.objects.filter(
+            uuid__in={genre_uuid for _, data in items for genre_uuid in data['genres']}
+        ).values_list('uuid', 'id'))
+
+        tracks = []
+        for index, data in items:
+            item_errors = {}
+            if isrc_counts[data['isrc']] > 1:
+                item_errors['isrc'] = ['ISRC repeated in the payload.']
+            elif data['isrc'] in existing_isrcs:
+                item_errors['isrc'] = ['A track with this ISRC already exists.']
+            price = prices.get(data['price'])
+            if price is None:
+                item_errors['price'] = ['Price not found.']
+            distributor = distributors.get(data['distributor']) if data.get('distributor') else None
+            if data.get('distributor') and distributor is None:
+                item_errors['distributor'] = ['Distributor not found.']
+            missing_genres = [str(genre_uuid) for genre_uuid in data['genres'] if genre_uuid not in genres]
+            if missing_genres:
+                item_errors['genres'] = [f'Genre not found: {genre_uuid}.' for genre_uuid in missing_genres]
+            if item_errors:
+                errors.append({'index': index, 'errors': item_errors})
+                continue
+            tracks.append({
+                **data,
+                'price': price,
+                'distributor': distributor,
+                'genres': [genres[genre_uuid] for genre_uuid in data['genres']],
+            })
+
+        if errors:
+            errors.sort(key=lambda error: error['index'])
+            return Response({'created': 0, 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        artist = request.user.artist
+        with transaction.atomic():
+            self.check_price_quota(artist, Counter(track['price'] for track in tracks))
+            created = create_tracks(artist, tracks)
+
+        data = {
+            'created': len(created),
+            'tracks': [{'uuid': track.uuid, 'isrc': track.isrc, 'name': track.name} for track in created],
+            'errors': [],
+        }
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    def check_price_quota(self, artist, new_tracks):
+        """
+        Validates that the artist can add the given number of tracks to each price,
+        e.g. {price: 1}. Must run inside a transaction: the artist row stays locked
+        until commit, so concurrent uploads of the same artist cannot exceed max_artist_tracks.
+        """
+        Artist.objects.select_for_update().get(pk=artist.pk)
+        track_counts = Price.get_artist_track_counts(artist)
+        for price, count in new_tracks.items():
+            available_tracks = price.get_available_tracks(artist, track_counts)
+            if available_tracks != 'unlimited' and count > available_tracks:
+                raise serializers.ValidationError({
+                    'price': [f'Track limit reached for price "{price}": {available_tracks} tracks available.']
+                })
 
 
 @extend_schema(
@@ -91,66 +311,192 @@ class MyTrackViewSet(viewsets.ModelViewSet):
         OpenApiParameter(name='name', description='Search by name', required=False, type=str),
     ],
 )
-class GenreViewSet(viewsets.ReadOnlyModelViewSet):
+class GenreViewSet(ReadOnlyResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = []
     authentication_classes = []
     queryset = Genre.objects.all()
-    serializer_class = GenreSerializer
+    serializer_class = GenreListSerializer
     pagination_class = StandardPagination
     lookup_field = 'uuid'
+    cache_models = [Genre]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['=code', 'name']
-    ordering_fields = ['name']
+    ordering_fields = ['name', 'track_count']
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(name='namespace', description=f'Only tags of a namespace: {", ".join(TAG_NAMESPACES)}', required=False, type=str),
+    ],
+)
+class TagViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Track tags, the most used first
+    """
+    permission_classes = []
+    authentication_classes = []
+    queryset = Tag.objects.filter(counter__track_count__gt=0).annotate(
+        track_count=F('counter__track_count')
+    ).order_by('-track_count', 'name')
+    serializer_class = TrackTagSerializer
+    pagination_class = StandardPagination
+    lookup_field = 'slug'
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['name']
+    ordering_fields = ['name', 'track_count']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        namespace = self.request.query_params.get('namespace', '').strip().lower()
+        if namespace:
+            if namespace not in TAG_NAMESPACES:
+                raise serializers.ValidationError({'namespace': f'Unknown namespace, one of: {", ".join(TAG_NAMESPACES)}.'})
+            queryset = queryset.filter(name__startswith=f'{namespace}{TAG_NAMESPACE_SEPARATOR}')
+        return queryset
 
 
-class PriceViewSet(viewsets.ReadOnlyModelViewSet):
+class PriceViewSet(ReadOnlyResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = []
     authentication_classes = []
-    queryset = Price.objects.all()
+    queryset = Price.objects.with_price_range().with_tier_prices().order_by('order')
     serializer_class = PriceSerializer
     pagination_class = StandardPagination
     lookup_field = 'uuid'
+    cache_models = [Price, TierPrice, Tier]
 
 
 class MyPriceViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
-    queryset = Price.objects.all()
+    queryset = Price.objects.with_price_range().with_tier_prices().order_by('order')
     serializer_class = MyPriceSerializer
     pagination_class = StandardPagination
     lookup_field = 'uuid'
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        artist = getattr(self.request.user, 'artist', None) if self.request else None
+        if artist:
+            # remaining quota of all prices from a single GROUP BY query
+            context['artist_track_counts'] = Price.get_artist_track_counts(artist)
+        return context
+
+
+class QuoteViewSet(viewsets.GenericViewSet):
+    permission_classes = [permissions.IsAuthenticated, IsBuyer]
+    serializer_class = QuoteRequestSerializer
+
+    @extend_schema(
+        request=QuoteRequestSerializer,
+        responses={200: QuoteSerializer},
+        description="Price a list of tracks for the buyer's tier.",
+    )
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        use_type = serializer.validated_data['use_type']
+        # unique uuids keeping the requested order
+        track_uuids = list(dict.fromkeys(serializer.validated_data['tracks']))
+
+        tracks = Track.objects.filter(uuid__in=track_uuids).only('uuid', 'name', 'price')
+        tracks_by_uuid = {track.uuid: track for track in tracks}
+        tier = request.user.buyer.tier
+
+        items, total = quote_tracks(
+            [tracks_by_uuid[track_uuid] for track_uuid in track_uuids if track_uuid in tracks_by_uuid],
+            tier.id,
+            use_type,
+            matrix=get_request_price_matrix(request)
+        )
+        quote = {
+            'use_type': use_type,
+            'tier': tier.code,
+            'tracks': [{'uuid': track.uuid, 'name': track.name, 'price': amount} for track, amount in items],
+            'not_found': [track_uuid for track_uuid in track_uuids if track_uuid not in tracks_by_uuid],
+            'count': len(items),
+            'total': total,
+        }
+        return Response(QuoteSerializer(quote).data, status=status.HTTP_200_OK)
+
 
 @extend_schema(
     parameters=[
         OpenApiParameter(name='name', description='Search by name', required=False, type=str),
     ],
 )
-class DistributorViewSet(viewsets.ReadOnlyModelViewSet):
+class DistributorViewSet(ReadOnlyResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = []
     authentication_classes = []
     queryset = Distributor.objects.all()
     serializer_class = DistributorSerializer
     pagination_class = StandardPagination
     lookup_field = 'uuid'
+    cache_models = [Distributor]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name']
     ordering_fields = ['name']
 
 
-class SyncListViewSet(viewsets.ReadOnlyModelViewSet):
+def get_synclist_tracks_prefetch(serializer=None):
+    """
+    Synclist tracks with everything TrackSerializer needs, synclist genres and tags
+    are computed from the prefetched track genres/tags (see SyncList.get_genres).
+    Given a sparse SyncListSerializer only what its selected fields need is loaded.
+    """
+    if serializer is None:
+        queryset = SyncListTrack.objects.select_related(
+            'track__artist', 'track__distributor', 'track__price'
+        ).prefetch_related(
+            'track__genres', 'track__tags', 'track__additional_main_artists', 'track__featured_artists'
+        ).defer('track__search_vector')
+        return Prefetch('synclisttrack_set', queryset=queryset)
+
+    fields = serializer.fields
+    only, select_related, prefetch_related = ['id', 'synclist', 'order', 'track', 'track__id'], ['track'], []
+    track_serializer = fields['tracks'].child.fields.get('track') if 'tracks' in fields else None
+    if track_serializer is not None:
+        track_only, track_select_related, track_prefetch_related = get_sparse_lookups(
+            track_serializer,
+            TrackViewSet.sparse_select_related,
+            TrackViewSet.sparse_prefetch_related,
+            TrackViewSet.sparse_expand_prefetch_related,
+            prefix='track__'
+        )
+        only += track_only
+        select_related += track_select_related
+        prefetch_related += track_prefetch_related
+    for name in ['genres', 'tags']:
+        if name in fields:
+            prefetch_related.append(f'track__{name}')
+
+    queryset = SyncListTrack.objects.select_related(*select_related).prefetch_related(*prefetch_related).only(*only)
+    return Prefetch('synclisttrack_set', queryset=queryset)
+
+
+@extend_schema(parameters=SPARSE_PARAMETERS)
+class SyncListViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = []
     authentication_classes = []
     queryset = SyncList.objects.none()
     serializer_class = SyncListSerializer
-    pagination_class = StandardPagination
+    pagination_class = ListingPagination
     lookup_field = 'uuid'
+    conditional_fields = ['updated', 'synclisttrack__track__updated']
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['order']
+    sparse_select_related = {
+        'artist': ['artist'],
+    }
 
     def get_queryset(self):
-        sync_list_tracks_prefetch = Prefetch('synclisttrack_set', queryset=SyncListTrack.objects.select_related('track'))
-        return SyncList.objects.select_related('artist').prefetch_related(sync_list_tracks_prefetch)
+        queryset = SyncList.objects.select_related('artist').prefetch_related(get_synclist_tracks_prefetch())
+        return self.apply_sparse_fieldset(queryset)
+
+    def get_sparse_lookups(self, serializer):
+        only, select_related, prefetch_related = super().get_sparse_lookups(serializer)
+        if {'tracks', 'genres', 'tags'}.intersection(serializer.fields):
+            prefetch_related.append(get_synclist_tracks_prefetch(serializer))
+        return only, select_related, prefetch_related
 
 
 class MySyncListViewSet(viewsets.ModelViewSet):
@@ -164,14 +510,16 @@ class MySyncListViewSet(viewsets.ModelViewSet):
     ordering_fields = ['order']
 
     def get_queryset(self):
-        sync_list_tracks_prefetch = Prefetch('synclisttrack_set', queryset=SyncListTrack.objects.select_related('track'))
-        return self.request.user.artist.synclists.prefetch_related(sync_list_tracks_prefetch)
+        return self.request.user.artist.synclists.select_related('artist').prefetch_related(get_synclist_tracks_prefetch())
 
-    def get_synclist_object(self, uuid):
-        qs = self.get_queryset()
+    def get_synclist_object(self, uuid, for_update=False):
+        # no track prefetches, the bulk actions only need the synclist row
+        qs = SyncList.objects.filter(artist=self.request.user.artist)
+        if for_update:
+            qs = qs.select_for_update()
         try:
             return qs.get(uuid=uuid)
-        except SyncList.DoesNotExist:
+        except (SyncList.DoesNotExist, ValueError, DjangoValidationError):
             raise SyncList.DoesNotExist
 
     def perform_create(self, serializer):
@@ -196,9 +544,10 @@ class MySyncListViewSet(viewsets.ModelViewSet):
                 )
             }
         ),
-        responses={201: None},
+        responses={201: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT},
         methods=['POST'],
-        description="Add multiple tracks to a SyncList.",
+        description="Add multiple tracks to a SyncList or update their order. Tracks must belong to the artist, "
+                    "invalid items are reported in `errors` with their index and the valid ones are applied.",
         examples=[
             OpenApiExample(
                 name="Example payload",
@@ -213,31 +562,68 @@ class MySyncListViewSet(viewsets.ModelViewSet):
     )
     @action(detail=True, methods=['post'], url_path='add-tracks')
     def add_tracks(self, request, uuid=None):
-        try:
-            synclist = self.get_synclist_object(uuid)
-        except SyncList.DoesNotExist:
-            return Response({'detail': 'SyncList not found'}, status=status.HTTP_404_NOT_FOUND)
-
         tracks_data = request.data.get('tracks', [])
 
         if not isinstance(tracks_data, list) or not tracks_data:
             return Response({"detail": "Tracks data must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
 
-        for track_data in tracks_data:
-            track_uuid = track_data.get('track_uuid')
-            order = track_data.get('order', 0)
-            track = get_object_or_404(Track, uuid=track_uuid)
-            
-            # Validate if the track belongs to the artist, if required
-            # if track.artist != self.request.user.artist:
-            #     continue
-            SyncListTrack.objects.update_or_create(
-                synclist=synclist,
-                track=track,
-                defaults={'order': order}
-            )
-
-        return Response({"detail": "Tracks added/updated successfully."}, status=status.HTTP_201_CREATED)
+        # validate the payload items, the last one wins for a repeated track
+        errors = []
+        items = {}
+        for index, track_data in enumerate(tracks_data):
+            item_serializer = SyncListTrackItemSerializer(data=track_data)
+            if not item_serializer.is_valid():
+                errors.append({'index': index, 'errors': item_serializer.errors})
+                continue
+            items[item_serializer.validated_data['track_uuid']] = (index, item_serializer.validated_data['order'])
+
+        with transaction.atomic():
+            try:
+                synclist = self.get_synclist_object(uuid, for_update=True)
+            except SyncList.DoesNotExist:
+                return Response({'detail': 'SyncList not found'}, status=status.HTTP_404_NOT_FOUND)
+
+            # one query to resolve the tracks, ownership checked on the same rows
+            tracks = list(Track.objects.filter(uuid__in=items).values_list('uuid', 'id', 'artist_id'))
+            track_ids = {}
+            for track_uuid, track_id, artist_id in tracks:
+                if artist_id != synclist.artist_id:
+                    errors.append({'index': items[track_uuid][0], 'errors': {'track_uuid': ['Track does not belong to the artist.']}})
+                else:
+                    track_ids[track_id] = items[track_uuid][1]
+            found = {track_uuid for track_uuid, _, _ in tracks}
+            for track_uuid, (index, _) in items.items():
+                if track_uuid not in found:
+                    errors.append({'index': index, 'errors': {'track_uuid': ['Track not found.']}})
+
+            # one query for the current memberships
+            existing = SyncListTrack.objects.filter(synclist=synclist, track_id__in=track_ids)
+            updated = []
+            current = set()
+            for synclist_track in existing:
+                current.add(synclist_track.track_id)
+                order = track_ids[synclist_track.track_id]
+                if synclist_track.order != order:
+                    synclist_track.order = order
+                    updated.append(synclist_track)
+
+            created = [
+                SyncListTrack(synclist=synclist, track_id=track_id, order=order)
+                for track_id, order in track_ids.items() if track_id not in current
+            ]
+            SyncListTrack.objects.bulk_create(created, batch_size=500)
+            SyncListTrack.objects.bulk_update(updated, ['order'], batch_size=500)
+            if created or updated:
+                # bulk operations skip the signals: new synclist ETag / Last-Modified
+                synclist.touch()
+            if created:
+                update_synclist_counts([synclist.pk])
+
+        errors.sort(key=lambda error: error['index'])
+        data = {'added': len(created), 'updated': len(updated), 'errors': errors}
+        if errors and not track_ids:
+            return Response(data, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data, status=status.HTTP_201_CREATED)
 
     @extend_schema(
         request=inline_serializer(
@@ -280,10 +666,74 @@ class MySyncListViewSet(viewsets.ModelViewSet):
         if not isinstance(tracks_data, list) or not tracks_data:
             return Response({"detail": "Tracks data must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
 
-        count = 0
-        for track_data in tracks_data:
-            track_uuid = track_data.get('track_uuid')
-            count += SyncListTrack.objects.filter(synclist=synclist, track__uuid=track_uuid).delete()[0]
-               
+        items_serializer = SyncListTrackItemSerializer(data=tracks_data, many=True)
+        if not items_serializer.is_valid():
+            return Response({'tracks': items_serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        track_uuids = [item['track_uuid'] for item in items_serializer.validated_data]
+
+        # queryset delete: the synclist is bumped once here, not per row (see synclist_track_deleted)
+        count = SyncListTrack.objects.filter(synclist=synclist, track__uuid__in=track_uuids).delete()[0]
+        if count:
+            synclist.touch()
+            update_synclist_counts([synclist.pk])
+
         message = f"{count} tracks removed successfully." if count else "No tracks found to remove."
         return Response({"detail": message}, status=status.HTTP_204_NO_CONTENT)
+
+    @extend_schema(
+        request=inline_serializer(
+            name='ReorderTracksSerializer',
+            fields={
+                'tracks': serializers.ListField(child=serializers.UUIDField(format='hex_verbose')),
+            }
+        ),
+        responses={200: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT},
+        methods=['POST'],
+        description="Reorder the SyncList tracks. Takes the full ordered list of the track uuids in the SyncList, "
+                    "only the tracks whose position changed are written.",
+        examples=[
+            OpenApiExample(
+                name="Example payload",
+                value={"tracks": ["uuid-of-track-2", "uuid-of-track-1", "uuid-of-track-3"]},
+                request_only=True,
+            ),
+        ]
+    )
+    @action(detail=True, methods=['post'])
+    def reorder(self, request, uuid=None):
+        tracks_serializer = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+        try:
+            track_uuids = tracks_serializer.run_validation(request.data.get('tracks', []))
+        except serializers.ValidationError as e:
+            return Response({'tracks': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            try:
+                synclist = self.get_synclist_object(uuid, for_update=True)
+            except SyncList.DoesNotExist:
+                return Response({'detail': 'SyncList not found'}, status=status.HTTP_404_NOT_FOUND)
+
+            # current positions, read through the (synclist, order) index
+            positions = {}
+            for synclist_track_id, track_uuid, order in SyncListTrack.objects.filter(
+                synclist=synclist
+            ).order_by('order', 'id').values_list('id', 'track__uuid', 'order'):
+                positions.setdefault(track_uuid, []).append((synclist_track_id, order))
+
+            if Counter(track_uuids) != Counter({track_uuid: len(rows) for track_uuid, rows in positions.items()}):
+                return Response(
+                    {'tracks': ['Must list every track of the SyncList in the new order.']},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # only the rows whose position changed are written
+            updated = []
+            for order, track_uuid in enumerate(track_uuids):
+                synclist_track_id, current_order = positions[track_uuid].pop(0)
+                if current_order != order:
+                    updated.append(SyncListTrack(id=synclist_track_id, order=order))
+            SyncListTrack.objects.bulk_update(updated, ['order'], batch_size=500)
+            if updated:
+                synclist.touch()
+
+        return Response({'updated': len(updated)}, status=status.HTTP_200_OK)
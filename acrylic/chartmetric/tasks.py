@@ -1,3 +1,4 @@
+import logging
 import time
 import celery
 from django.apps import apps
@@ -5,6 +6,9 @@ from chartmetric.engine import Chartmetric
 from acrylic.celery import app
 
 
+logger = logging.getLogger(__name__)
+
+
 @app.task
 def load_chartmetric_artist_ids(artist_id, force=False):
     # NOT USED!
@@ -27,11 +31,35 @@ def load_chartmetric_artist_ids(artist_id, force=False):
                     artist_data = data['obj']['artists'][0]
                     # store chartmetric id
                     artist.chartmetric_id = artist_data['id']
-                    print(f'Artist: {artist.chartmetric_id}')
+                    logger.info('Artist %s Chartmetric ID: %s', artist.id, artist.chartmetric_id)
                     track.save()
     return True
 
 
+def set_chartmetric_id(track, cm):
+    """
+    Sets the Chartmetric ID of the track from its ISRC, and of the artist when missing.
+    cm is an authenticated Chartmetric client, the track is not saved.
+    """
+    # chartmetric 1rps
+    time.sleep(1.5)
+    data = cm.get_track_artist_ids_from_isrc(track.isrc)
+    if 'error' not in data and data.get('obj'):
+        if len(data['obj']['tracks']) > 0:
+            track_data = data['obj']['tracks'][0]
+            if track_data['isrc'] == track.isrc:
+                # ensure that ISRC matches
+                track.chartmetric_id = track_data['id']
+                logger.info('Track %s Chartmetric ID: %s', track.id, track.chartmetric_id)
+                if not track.artist.chartmetric_id:
+                    artist = track.artist
+                    artist.chartmetric_id = track_data['artist'][0]['id']
+                    artist.save()
+                    logger.info('Artist %s Chartmetric ID: %s', artist.id, artist.chartmetric_id)
+                return True
+    return False
+
+
 @app.task
 def load_chartmetric_ids(track_id, force=False):
     Track = apps.get_model('catalog', 'track')
@@ -45,22 +73,8 @@ def load_chartmetric_ids(track_id, force=False):
             # auth in chartmetric
             cm = Chartmetric()
             cm.authenticate()
-            # chartmetric 1rps
-            time.sleep(1.5)
-            data = cm.get_track_artist_ids_from_isrc(track.isrc)
-            if 'error' not in data and data.get('obj'):
-                if len(data['obj']['tracks']) > 0:
-                    track_data = data['obj']['tracks'][0]
-                    if track_data['isrc'] == track.isrc:
-                        # ensure that ISRC matches
-                        track.chartmetric_id = track_data['id']
-                        print(f'Track: {track.chartmetric_id}')
-                        if not track.artist.chartmetric_id:
-                            artist = track.artist
-                            artist.chartmetric_id = track_data['artist'][0]['id']
-                            artist.save()
-                            print(f'Artist: {artist.chartmetric_id}')
-                        track.save()
+            if set_chartmetric_id(track, cm):
+                track.save()
     return True
 
 
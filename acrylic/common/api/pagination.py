@@ -1,7 +1,172 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import replace_query_param
 
 
 class StandardPagination(PageNumberPagination):
     page_size = 25
     page_size_query_param = 'page_size'
     max_page_size = 100
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset pagination: no COUNT(*) and no OFFSET, every page is a range query
+    on the first ordering field (?ordering= or the queryset/model default)
+    with the primary key as tiebreaker. NULL values are sorted last.
+    """
+    page_size = StandardPagination.page_size
+    page_size_query_param = StandardPagination.page_size_query_param
+    max_page_size = StandardPagination.max_page_size
+    ordering = '-pk'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.key, self.descending = self.get_key(request, queryset, view)
+        self.model = queryset.model
+
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor[2]
+
+        descending = self.descending != reverse
+        queryset = queryset.order_by(*self.get_order_by(descending, nulls_last=not reverse))
+        if self.cursor is not None:
+            value, pk, _ = self.cursor
+            queryset = queryset.filter(self.get_position_filter(value, pk, descending, nulls_last=not reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+
+        self.has_next = has_more if not reverse else True
+        self.has_previous = has_more if reverse else self.cursor is not None
+        return self.page
+
+    def get_key(self, request, queryset, view):
+        """
+        Returns the (key, descending) pair used to build the keyset
+        """
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        if not ordering:
+            ordering = queryset.query.order_by or queryset.model._meta.ordering or [self.ordering]
+
+        term = ordering[0] if isinstance(ordering[0], str) else self.ordering
+        key = term.lstrip('-')
+        if key == 'id' or key == 'pk' or '__' in key or not self.is_valid_key(queryset, key):
+            key = 'pk'
+        return key, term.startswith('-')
+
+    def is_valid_key(self, queryset, key):
+        if key in queryset.query.annotations:
+            return True
+        try:
+            field = queryset.model._meta.get_field(key)
+        except FieldDoesNotExist:
+            return False
+        return field.concrete and not field.is_relation
+
+    def get_order_by(self, descending, nulls_last):
+        if self.key == 'pk':
+            return ['-pk' if descending else 'pk']
+        nulls = {'nulls_last': True} if nulls_last else {'nulls_first': True}
+        key = F(self.key).desc(**nulls) if descending else F(self.key).asc(**nulls)
+        return [key, '-pk' if descending else 'pk']
+
+    def get_position_filter(self, value, pk, descending, nulls_last):
+        """
+        Rows strictly after (value, pk) in the given ordering
+        """
+        after = 'lt' if descending else 'gt'
+        if self.key == 'pk':
+            return Q(**{f'pk__{after}': pk})
+
+        if value is None:
+            ties = Q(**{f'{self.key}__isnull': True, f'pk__{after}': pk})
+            return ties if nulls_last else ties | Q(**{f'{self.key}__isnull': False})
+
+        ties = Q(**{f'{self.key}__{after}': value}) | Q(**{self.key: value, f'pk__{after}': pk})
+        return ties | Q(**{f'{self.key}__isnull': True}) if nulls_last else ties
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, obj, reverse):
+        value = None if self.key == 'pk' else getattr(obj, self.key)
+        data = json.dumps({'v': value, 'k': obj.pk, 'r': int(reverse)}, cls=JSONEncoder)
+        encoded = urlsafe_b64encode(data.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            data = json.loads(urlsafe_b64decode(encoded.encode()).decode())
+            value, pk, reverse = data['v'], data['k'], bool(data['r'])
+            if value is not None and self.key in [field.name for field in self.model._meta.concrete_fields]:
+                value = self.model._meta.get_field(self.key).to_python(value)
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk, reverse
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class ListingPagination(StandardPagination):
+    """
+    Page number pagination by default, keyset pagination when the ?cursor=
+    param is present (an empty ?cursor= returns the first page). Meant for
+    infinite scroll clients: no COUNT(*) and no OFFSET on deep pages.
+    """
+    cursor_query_param = KeysetPagination.cursor_query_param
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Keyset pagination cursor, use an empty value for the first page. Responses have no count.',
+                'schema': {'type': 'string'},
+            },
+        ]
@@ -0,0 +1,112 @@
+from django.core.exceptions import FieldDoesNotExist
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework.permissions import SAFE_METHODS
+
+
+SPARSE_PARAMS = ['fields', 'omit', 'expand']
+
+SPARSE_PARAMETERS = [
+    OpenApiParameter(name='fields', description='Comma separated fields to include, dotted paths for nested fields, e.g. name,tracks.track.name', required=False, type=str),
+    OpenApiParameter(name='omit', description='Comma separated fields to leave out, e.g. lyrics,tags', required=False, type=str),
+    OpenApiParameter(name='expand', description='Comma separated related fields to nest, e.g. artist,price', required=False, type=str),
+]
+
+
+def get_param_paths(request, param):
+    value = request.query_params.get(param, '')
+    return [path.strip() for path in value.split(',') if path.strip()]
+
+
+def has_sparse_params(request):
+    return any(request.query_params.get(param) for param in SPARSE_PARAMS)
+
+
+class SparseFieldsMixin:
+    """
+    Sparse fieldsets on read requests:
+        ?fields=uuid,name    only the given fields
+        ?omit=lyrics         every field but the given ones
+        ?expand=artist       nested representation of the expandable_fields
+    Dotted paths apply to nested serializers, e.g. ?fields=name,tracks.track.name
+    """
+    # field name -> (serializer class, kwargs) used when the field is expanded
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        # path of serializers created outside a parent serializer, e.g. in a SerializerMethodField
+        self.sparse_path = kwargs.pop('sparse_path', None)
+        self.expanded_fields = set()
+        super().__init__(*args, **kwargs)
+
+    def get_sparse_path(self):
+        names = []
+        node = self
+        while node is not None:
+            if getattr(node, 'sparse_path', None) is not None:
+                names.append(node.sparse_path)
+                break
+            if node.field_name:
+                names.append(node.field_name)
+            node = node.parent
+        return '.'.join(name for name in reversed(names) if name)
+
+    def get_nested_path(self, field_name):
+        """
+        sparse_path for a serializer rendered by one of our fields, e.g. in a SerializerMethodField
+        """
+        path = self.get_sparse_path()
+        return f'{path}.{field_name}' if path else field_name
+
+    def get_sparse_paths(self, request, param):
+        """
+        Paths of the query param relative to this serializer
+        """
+        path = self.get_sparse_path()
+        prefix = f'{path}.' if path else ''
+        return [item[len(prefix):] for item in get_param_paths(request, param) if item.startswith(prefix)]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS or not has_sparse_params(request):
+            return fields
+
+        for name in self.get_sparse_paths(request, 'expand'):
+            if name in self.expandable_fields and name in fields:
+                serializer_class, kwargs = self.expandable_fields[name]
+                fields[name] = serializer_class(read_only=True, **kwargs)
+                self.expanded_fields.add(name)
+
+        selected = {item.split('.')[0] for item in self.get_sparse_paths(request, 'fields')}
+        if selected:
+            fields = fields.__class__((name, field) for name, field in fields.items() if name in selected)
+        for name in self.get_sparse_paths(request, 'omit'):
+            fields.pop(name, None)
+        return fields
+
+
+def get_sparse_lookups(serializer, select_related=None, prefetch_related=None, expand_prefetch_related=None, prefix=''):
+    """
+    Returns the (only, select_related, prefetch_related) lookups needed to render
+    the fields selected on the serializer. The mappings give the lookups of each
+    serializer field, prefix nests everything, e.g. 'track__'.
+    """
+    model = serializer.Meta.model
+    only, select, prefetch = [prefix + model._meta.pk.name], [], []
+
+    for name, field in serializer.fields.items():
+        source = field.source.split('.')[0]
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            pass
+        else:
+            if model_field.concrete and not model_field.many_to_many:
+                only.append(prefix + source)
+
+        select += [prefix + lookup for lookup in (select_related or {}).get(name, [])]
+        prefetch += [prefix + lookup for lookup in (prefetch_related or {}).get(name, [])]
+        if name in getattr(serializer, 'expanded_fields', []):
+            prefetch += [prefix + lookup for lookup in (expand_prefetch_related or {}).get(name, [])]
+
+    return only, select, prefetch
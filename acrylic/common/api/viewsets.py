@@ -0,0 +1,109 @@
+import hashlib
+from calendar import timegm
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from common.api.serializers import get_sparse_lookups, has_sparse_params
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified headers for list and retrieve derived from BaseModel.updated.
+    A cheap max(updated) / count probe answers If-None-Match / If-Modified-Since
+    with 304 before the payload is loaded and serialized.
+    """
+    # updated fields the payload depends on, related lookups allowed (e.g. 'tracks__updated')
+    conditional_fields = ['updated']
+
+    def get_conditional_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get_conditional_state(self):
+        """
+        Returns (count, last modified) for the current request, None when it can't be computed
+        """
+        aggregates = {f'updated_{i}': Max(field) for i, field in enumerate(self.conditional_fields)}
+        try:
+            state = self.get_conditional_queryset().order_by().aggregate(
+                count=Count('pk', distinct=True), **aggregates
+            )
+        except (TypeError, ValueError, ValidationError):
+            # invalid lookup value, let the view answer it
+            return None
+
+        updated = [state[key] for key in aggregates if state[key] is not None]
+        if not updated or (self.action == 'retrieve' and not state['count']):
+            return None
+        return state['count'], max(updated)
+
+    def conditional_get(self, request, handler, *args, **kwargs):
+        state = self.get_conditional_state()
+        if state is None:
+            return handler(request, *args, **kwargs)
+
+        count, updated = state
+        key = f'{request.get_full_path()}:{count}:{updated.isoformat()}'
+        etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+        last_modified = timegm(updated.utctimetuple())
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_get(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_get(request, super().retrieve, *args, **kwargs)
+
+
+class SparseFieldsetMixin:
+    """
+    Applies the serializer ?fields= / ?omit= / ?expand= selection to the list and
+    retrieve queryset: columns of the fields left out are deferred and their joins
+    and prefetches are dropped. Without those params the queryset is left untouched.
+    """
+    # serializer field -> select_related / prefetch_related lookups needed to render it
+    sparse_select_related = {}
+    sparse_prefetch_related = {}
+    # serializer field -> extra prefetch_related lookups when it is expanded
+    sparse_expand_prefetch_related = {}
+
+    def get_sparse_lookups(self, serializer):
+        only, select_related, prefetch_related = get_sparse_lookups(
+            serializer, self.sparse_select_related, self.sparse_prefetch_related, self.sparse_expand_prefetch_related
+        )
+        # keyset pagination reads the ordering value of the first and last rows
+        ordering = self.request.query_params.get('ordering', '').split(',') + list(serializer.Meta.model._meta.ordering)
+        for term in ordering:
+            name = term.strip().lstrip('-')
+            try:
+                field = serializer.Meta.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete and not field.is_relation:
+                only.append(name)
+        return only, select_related, prefetch_related
+
+    def get_queryset(self):
+        return self.apply_sparse_fieldset(super().get_queryset())
+
+    def apply_sparse_fieldset(self, queryset):
+        if self.action not in ['list', 'retrieve'] or not has_sparse_params(self.request):
+            return queryset
+
+        only, select_related, prefetch_related = self.get_sparse_lookups(self.get_serializer())
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset.only(*only)
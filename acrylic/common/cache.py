@@ -0,0 +1,116 @@
+import hashlib
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from rest_framework.response import Response
+
+
+RESPONSE_CACHE_VERSION_KEY = 'response-cache:version:{}'
+RESPONSE_CACHE_STATS_KEY = 'response-cache:stats:{}:{}'
+
+
+def get_model_versions(models):
+    """
+    Current cache version of each model, a model change gives a new version
+    so the cached responses that depend on it are not read anymore.
+    """
+    keys = [RESPONSE_CACHE_VERSION_KEY.format(model._meta.label_lower) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate_model_cache(model):
+    cache.set(RESPONSE_CACHE_VERSION_KEY.format(model._meta.label_lower), uuid.uuid4().hex, None)
+
+
+def model_changed(sender, **kwargs):
+    transaction.on_commit(lambda: invalidate_model_cache(sender))
+
+
+def register_cache_invalidation(*models):
+    """
+    Invalidate the cached responses of the given models on post_save / post_delete
+    """
+    for model in models:
+        uid = f'response-cache:{model._meta.label_lower}'
+        post_save.connect(model_changed, sender=model, dispatch_uid=uid)
+        post_delete.connect(model_changed, sender=model, dispatch_uid=uid)
+
+
+def count_cache_result(name, result):
+    key = RESPONSE_CACHE_STATS_KEY.format(name, result)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # evicted between add and incr
+        pass
+
+
+def get_response_cache_stats(name):
+    """
+    Hit / miss counters of a cached viewset, e.g. get_response_cache_stats('GenreViewSet')
+    """
+    keys = {result: RESPONSE_CACHE_STATS_KEY.format(name, result) for result in ['hit', 'miss']}
+    values = cache.get_many(keys.values())
+    return {result: values.get(key, 0) for result, key in keys.items()}
+
+
+class ResponseCacheMixin:
+    """
+    Shared cache for responses of public read-only views: handlers return cached_response(...).
+    Keys include the url with its query params and the version of each model
+    in cache_models, see register_cache_invalidation.
+    """
+    cache_models = []
+    cache_timeout = None
+
+    def get_cache_timeout(self):
+        if self.cache_timeout is not None:
+            return self.cache_timeout
+        return settings.RESPONSE_CACHE_TIMEOUT
+
+    def get_response_cache_key(self, request):
+        params = sorted(request.query_params.lists())
+        versions = get_model_versions(self.cache_models)
+        key = f'{self.action}:{self.kwargs}:{request.get_host()}:{request.path}:{params}:{versions}'
+        return f'response-cache:{self.__class__.__name__}:{hashlib.md5(key.encode()).hexdigest()}'
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        timeout = self.get_cache_timeout()
+        if not timeout:
+            return handler(request, *args, **kwargs)
+
+        name = self.__class__.__name__
+        cache_key = self.get_response_cache_key(request)
+        data = cache.get(cache_key)
+        if data is not None:
+            count_cache_result(name, 'hit')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        count_cache_result(name, 'miss')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(cache_key, response.data, timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class ReadOnlyResponseCacheMixin(ResponseCacheMixin):
+    """
+    Cached list and retrieve for read-only model viewsets
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
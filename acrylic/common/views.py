@@ -1,12 +1,16 @@
 from django_countries.data import COUNTRIES
 from rest_framework import viewsets, filters, permissions, status, serializers, response
+from common.cache import ResponseCacheMixin
 
 
-class CountryViewSet(viewsets.ViewSet):
+class CountryViewSet(ResponseCacheMixin, viewsets.ViewSet):
     permission_classes = []
     authentication_classes = []
 
     def list(self, request):
+        return self.cached_response(request, self.list_countries)
+
+    def list_countries(self, request):
         choices = []
         choice_dict = dict(COUNTRIES)
 
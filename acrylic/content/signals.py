@@ -0,0 +1,5 @@
+from common.cache import register_cache_invalidation
+from content.models import Article
+
+
+register_cache_invalidation(Article)
@@ -1,3 +1,18 @@
 from django.contrib import admin
+from spotify.models import SpotifyPlaylist, SpotifyPlaylistTrack
 
-# Register your models here.
+
+class SpotifyPlaylistTrackInline(admin.TabularInline):
+    model = SpotifyPlaylistTrack
+    extra = 0
+    fields = ['track', 'position', 'added']
+    raw_id_fields = ['track']
+
+
+@admin.register(SpotifyPlaylist)
+class SpotifyPlaylistAdmin(admin.ModelAdmin):
+    list_display = ['uuid', 'name', 'spotify_id', 'snapshot_id', 'is_active', 'synced', 'created', 'updated']
+    list_filter = ['is_active', 'synced', 'created']
+    search_fields = ['uuid', 'name', 'spotify_id']
+    readonly_fields = ['snapshot_id', 'synced']
+    inlines = [SpotifyPlaylistTrackInline]
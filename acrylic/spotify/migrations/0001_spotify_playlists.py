@@ -0,0 +1,74 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:57
+
+import common.models
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('catalog', '0030_track_enrichment_pending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpotifyPlaylist',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('spotify_id', models.CharField(max_length=30, unique=True)),
+                ('name', models.CharField(blank=True, max_length=250)),
+                ('snapshot_id', models.CharField(blank=True, editable=False, max_length=100)),
+                ('synced', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SpotifyPlaylistTrack',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('added', models.DateTimeField(blank=True, help_text='Added to the Spotify playlist', null=True)),
+                ('playlist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='playlist_tracks', to='spotify.spotifyplaylist')),
+                ('track', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalog.track')),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.AddField(
+            model_name='spotifyplaylist',
+            name='tracks',
+            field=models.ManyToManyField(blank=True, related_name='spotify_playlists', through='spotify.SpotifyPlaylistTrack', to='catalog.track'),
+        ),
+        migrations.AddIndex(
+            model_name='spotifyplaylisttrack',
+            index=models.Index(fields=['playlist', 'position'], name='spotify_spo_playlis_d23cd8_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='spotifyplaylisttrack',
+            constraint=models.UniqueConstraint(fields=('playlist', 'track'), name='unique_spotify_playlist_track'),
+        ),
+        migrations.AddIndex(
+            model_name='spotifyplaylist',
+            index=common.models.PostgresIndex(fields=['uuid'], name='spotify_spotifyplaylist_uuid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='spotifyplaylist',
+            index=common.models.PostgresIndex(fields=['created'], name='spotify_spotifyplaylist_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='spotifyplaylist',
+            index=common.models.PostgresIndex(fields=['updated'], name='spotify_spotifyplaylist_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='spotifyplaylist',
+            index=models.Index(fields=['synced'], name='spotify_spo_synced_629337_idx'),
+        ),
+    ]
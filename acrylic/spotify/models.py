@@ -1,3 +1,50 @@
 from django.db import models
+from common.models import BaseModel, ActiveManager
 
-# Create your models here.
+
+class SpotifyPlaylist(BaseModel):
+    """
+    Spotify playlist imported into the catalog. Active playlists are synced periodically
+    (see spotify.tasks.sync_spotify_playlists), and only when their snapshot_id changed.
+    """
+    spotify_id = models.CharField(max_length=30, unique=True)
+    name = models.CharField(max_length=250, blank=True)
+    # version of the playlist at the last sync
+    snapshot_id = models.CharField(max_length=100, blank=True, editable=False)
+    synced = models.DateTimeField(blank=True, null=True, editable=False)
+    tracks = models.ManyToManyField('catalog.Track', through='spotify.SpotifyPlaylistTrack', related_name='spotify_playlists', blank=True)
+
+    # monitored by the periodic sync
+    is_active = models.BooleanField(default=True)
+
+    # managers
+    objects = models.Manager()
+    active = ActiveManager()
+
+    class Meta:
+        indexes = BaseModel.Meta.indexes + [
+            models.Index(fields=['synced']),
+        ]
+
+    def __str__(self):
+        return self.name or self.spotify_id
+
+    def get_spotify_url(self):
+        return f'https://open.spotify.com/playlist/{self.spotify_id}'
+
+
+class SpotifyPlaylistTrack(models.Model):
+    playlist = models.ForeignKey('spotify.SpotifyPlaylist', related_name='playlist_tracks', on_delete=models.CASCADE)
+    track = models.ForeignKey('catalog.Track', related_name='+', on_delete=models.CASCADE)
+    # index in the Spotify playlist, the first occurrence when a track is repeated
+    position = models.PositiveIntegerField(default=0)
+    added = models.DateTimeField(blank=True, null=True, help_text='Added to the Spotify playlist')
+
+    class Meta:
+        ordering = ['position']
+        indexes = [
+            models.Index(fields=['playlist', 'position']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['playlist', 'track'], name='unique_spotify_playlist_track'),
+        ]
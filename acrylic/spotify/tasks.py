@@ -1,11 +1,24 @@
+import logging
 import requests
 import celery
 from spotify.engine import spotify_client
 from django.apps import apps
+from django.core.cache import cache
 from django.core.files.base import ContentFile
+from django.db.models import F
+from django.utils import timezone
 from acrylic.celery import app
 
 
+logger = logging.getLogger(__name__)
+
+# max ids of a Spotify "several artists" request
+SPOTIFY_ARTISTS_BATCH = 50
+
+PLAYLIST_SYNC_LOCK_KEY = 'spotify:playlist-sync:lock'
+PLAYLIST_SYNC_LOCK_TIMEOUT = 60 * 60
+
+
 @app.task
 def load_spotify_artist_data(artist_id):
     Artist = apps.get_model('artist', 'Artist')
@@ -42,6 +55,93 @@ def load_spotify_artist_data(artist_id):
             artist.save()
     return True
 
+
+@app.task
+def load_spotify_artists_data(artist_ids):
+    """
+    Loads the profile image of artists imported in bulk, one Spotify request per
+    SPOTIFY_ARTISTS_BATCH artists and one bulk_update
+    """
+    Artist = apps.get_model('artist', 'Artist')
+    artists = list(Artist.objects.filter(id__in=artist_ids).exclude(spotify_id='').only('id', 'spotify_id', 'image'))
+    if not artists:
+        return 0
+
+    spotify = spotify_client()
+    now = timezone.now()
+    updated = []
+    for i in range(0, len(artists), SPOTIFY_ARTISTS_BATCH):
+        batch = artists[i:i + SPOTIFY_ARTISTS_BATCH]
+        results = spotify.artists([artist.spotify_id for artist in batch])['artists']
+        for artist, artist_data in zip(batch, results):
+            images = artist_data.get('images', []) if artist_data else []
+            if images and not artist.image:
+                image_file = requests.get(images[0]['url'])
+                artist.image.save('profile.jpg', ContentFile(image_file.content), save=False)
+                artist.updated = now
+                updated.append(artist)
+    Artist.objects.bulk_update(updated, ['image', 'updated'])
+    return len(updated)
+
+
+def find_spotify_track(spotify, isrc):
+    """
+    First Spotify track where the ISRC matches, None when not found
+    """
+    results = spotify.search(q=f'isrc:{isrc}', type='track')
+    tracks = [t for t in results['tracks']['items'] if t['external_ids']['isrc'] == isrc]
+    return tracks[0] if tracks else None
+
+
+def set_spotify_id(track, spotify):
+    """
+    Sets the Spotify ID of the track from its ISRC, and of the artist when missing.
+    The track is not saved.
+    """
+    track_data = find_spotify_track(spotify, track.isrc)
+    if track_data:
+        track.spotify_id = track_data['id']
+        logger.info('Track %s Spotify ID: %s', track.id, track.spotify_id)
+        if not track.artist.spotify_id:
+            artist = track.artist
+            artist.spotify_id = track_data['artists'][0]['id']
+            artist.save()
+            logger.info('Artist %s Spotify ID: %s', artist.id, artist.spotify_id)
+    else:
+        logger.info('%s, %s - ISRC %s: no Spotify track found', track.name, track.artist.name, track.isrc)
+    return track_data is not None
+
+
+def needs_spotify_track_data(track, force=False):
+    fields = ['name', 'cover_image', 'snippet']
+    return force == True or any([getattr(track, field) in [None, ''] for field in fields])
+
+
+def set_spotify_track_data(track, track_info, force=False):
+    """
+    Loads name, cover art and 30 sec preview from the Spotify track info.
+    Files are stored but the track is not saved.
+    """
+    # load name
+    if force or not track.name:
+        track.name = track_info['name']
+
+    # load cover art
+    if force or not track.cover_image:
+        try:
+            image_url = track_info['album']['images'][0]['url']
+        except (KeyError, IndexError):
+            image_url = ''
+        else:
+            image_file = requests.get(image_url)
+            track.cover_image.save('cover.jpg', ContentFile(image_file.content), save=False)
+
+    # load 30 sec preview mp3
+    if force or not track.snippet and track_info.get('preview_url', None):
+        snippet_file = requests.get(track_info['preview_url'])
+        track.snippet.save('snippet.mp3', ContentFile(snippet_file.content), save=False)
+
+
 @app.task 
 def load_spotify_id(track_id, force=False, load_data=False):
     Track = apps.get_model('catalog', 'track')
@@ -52,19 +152,7 @@ def load_spotify_id(track_id, force=False, load_data=False):
     else:
         if force == True or track.spotify_id == '':
             spotify = spotify_client()
-            results = spotify.search(q=f'isrc:{track.isrc}', type='track')
-            tracks = [t for t in results['tracks']['items'] if t['external_ids']['isrc'] == track.isrc]
-            if len(tracks) > 0:
-                # first track where ISRC matches
-                track.spotify_id = tracks[0]['id']
-                print(f'Track Spotify ID: {track.spotify_id}')
-                if not track.artist.spotify_id:
-                    artist = track.artist        
-                    artist.spotify_id = tracks[0]['artists'][0]['id']
-                    artist.save()
-                    print(f'Artist Spotify ID: {artist.spotify_id}')
-            else:
-                print(f'{track.name}, {track.artist.name} - ISRC {track.isrc} No track ID found')
+            set_spotify_id(track, spotify)
             track.save()
 
         if load_data:
@@ -83,30 +171,10 @@ def load_spotify_track_data(track_id, force=False):
     except Track.DoesNotExist:
         pass
     else:
-        fields = ['name', 'cover_image', 'snippet']
-        if force == True or any([getattr(track, field) in [None, ''] for field in fields]):
+        if needs_spotify_track_data(track, force):
             spotify = spotify_client()
             track_info = spotify.track(f'spotify:track:{track.spotify_id}')
-            album_images = track_info['album']['images']
-
-            # load name
-            if force or not track.name:
-                track.name = track_info['name']
-
-            # load cover art
-            if force or not track.cover_image:
-                try:
-                    image_url = track_info['album']['images'][0]['url']
-                except KeyError:
-                    image_url = ''
-                else:
-                    image_file = requests.get(image_url)
-                    track.cover_image.save('cover.jpg', ContentFile(image_file.content))
-
-            # load 30 sec preview mp3
-            if force or not track.snippet and track_info.get('preview_url', None):
-                snippet_file = requests.get(track_info['preview_url'])
-                track.snippet.save('snippet.mp3', ContentFile(snippet_file.content))
+            set_spotify_track_data(track, track_info, force)
             
             # save track
             track.save()
@@ -123,11 +191,8 @@ def split_sheet_load_spotify_data_task(split_sheet_id):
         pass
     else:
         spotify = spotify_client()
-        results = spotify.search(q=f'isrc:{split_sheet.isrc}', type='track')
-
-        tracks = [t for t in results['tracks']['items'] if t['external_ids']['isrc'] == split_sheet.isrc]
-        if len(tracks) > 0:
-            track_data = tracks[0]
+        track_data = find_spotify_track(spotify, split_sheet.isrc)
+        if track_data:
             try:
                 image_url = track_data['album']['images'][0]['url']
             except KeyError:
@@ -140,3 +205,28 @@ def split_sheet_load_spotify_data_task(split_sheet_id):
             split_sheet.save()
     
     return True
+
+
+@app.task
+def sync_spotify_playlists():
+    """
+    Syncs the active Spotify playlists, the least recently synced first (see
+    catalog.playlists.PlaylistSync). Runs periodically (see acrylic.celery), a cache
+    lock keeps a single sync running at a time.
+    """
+    # catalog.playlists imports this module
+    from catalog.playlists import PlaylistSync
+    SpotifyPlaylist = apps.get_model('spotify', 'SpotifyPlaylist')
+
+    if not cache.add(PLAYLIST_SYNC_LOCK_KEY, 1, PLAYLIST_SYNC_LOCK_TIMEOUT):
+        return 0
+    try:
+        playlist_sync = PlaylistSync(spotify_client())
+        for playlist in SpotifyPlaylist.active.order_by(F('synced').asc(nulls_first=True)):
+            try:
+                playlist_sync.sync(playlist)
+            except Exception:
+                logger.exception('Sync failed for Spotify playlist %s', playlist.spotify_id)
+        return playlist_sync.stats['playlists_synced']
+    finally:
+        cache.delete(PLAYLIST_SYNC_LOCK_KEY)